@@ -1,16 +1,61 @@
-from openai import OpenAI
-from typing import Dict, Any, List
+from openai import DefaultAsyncHttpxClient
+from typing import Dict, Any, List, AsyncIterator, Optional, Set, Tuple
+import httpx
 import json
 import os
 from functools import lru_cache
 import hashlib
 from datetime import datetime
+from cache import LRUCache, PersistentCache, SingleFlight
+from duplicates import DuplicateDetector
+from streaming import JSONFieldStream, FieldBroadcast
+from llm_router import LLMRouter, BACKEND_DEFAULTS
+from llm_scheduler import LLMScheduler, estimate_tokens, PRIORITY_INTERACTIVE, PRIORITY_BATCH, PRIORITY_BACKGROUND
+from formatter import RuleBasedFormatter, POLICIES, POLICY_RULES_FIRST, POLICY_RULES_ONLY, POLICY_LLM_ALWAYS
+import asyncio
+
+
+# Shared connection pool limits for the async LLM client
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "20"))
+LLM_MAX_KEEPALIVE = int(os.getenv("LLM_MAX_KEEPALIVE", "10"))
+
+# Form response cache limits
+AGENT_CACHE_MAX_ENTRIES = int(os.getenv("AGENT_CACHE_MAX_ENTRIES", "10000"))
+AGENT_CACHE_MAX_BYTES = int(os.getenv("AGENT_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+AGENT_CACHE_TTL_SECONDS = float(os.getenv("AGENT_CACHE_TTL_SECONDS", "3600"))
+
+# Persistent response cache shared by all workers (empty path disables it)
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "./llm_cache.db")
+LLM_CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+LLM_CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+LLM_CACHE_WARM_ENTRIES = int(os.getenv("LLM_CACHE_WARM_ENTRIES", "1000"))
+
+# Bump whenever the form-formatting prompt changes so old responses are not reused
+FORM_PROMPT_VERSION = "form-v1"
+
+# Records packed into a single completion by the batch formatter
+FORM_BATCH_SIZE = int(os.getenv("FORM_BATCH_SIZE", "10"))
+
+# Answer form lookups from raw or last-known data and refine with the LLM in the background
+AGENT_SWR_MODE = os.getenv("AGENT_SWR_MODE", "false").lower() == "true"
+
+# How map_uuid_to_form chooses between the local rule formatter and the LLM
+FORMATTER_POLICY = os.getenv("FORMATTER_POLICY", POLICY_RULES_FIRST).lower()
+
+# Send borderline duplicate candidates to the LLM for a verdict
+DUPLICATE_LLM_ADJUDICATION = os.getenv("DUPLICATE_LLM_ADJUDICATION", "false").lower() == "true"
+DUPLICATE_ADJUDICATION_LIMIT = int(os.getenv("DUPLICATE_ADJUDICATION_LIMIT", "20"))
+
+FORM_FIELDS = ["uuid", "name", "email", "phone", "address", "company", "position", "notes"]
+FORM_SYSTEM_PROMPT = """You are a form-filling assistant. Format the data professionally and return JSON with these fields: uuid, name, email, phone, address, company, position, notes. Keep it concise."""
 
 
 class UUIDAgent:
     """LLM-powered intelligent agent for form management, duplicate detection, and user learning"""
     
-    def __init__(self, api_key: str = None, model: str = None, provider: str = "openai"):
+    def __init__(self, api_key: str = None, model: str = None, provider: str = "openai",
+                 formatter_policy: str = FORMATTER_POLICY,
+                 backends: Optional[List[Dict[str, Any]]] = None):
         """
         Initialize agent with specified LLM provider
         
@@ -18,27 +63,202 @@ class UUIDAgent:
             api_key: API key for OpenAI (not needed for LM Studio)
             model: Model name (e.g., "gpt-4o-mini" for OpenAI, "gemma-3" for LM Studio)
             provider: "openai" or "lmstudio"
+            formatter_policy: "rules_first", "rules_only" or "llm_always"
+            backends: Router backends (name, base_url, api_key, model) in priority
+                order; when given, api_key, model and provider are ignored
+        """
+        if formatter_policy not in POLICIES:
+            raise ValueError(f"Unknown formatter policy: {formatter_policy}")
+        
+        self.formatter = RuleBasedFormatter()
+        self.duplicate_detector = DuplicateDetector()
+        self.formatter_policy = formatter_policy
+        self.completions_avoided = 0  # Requests answered by the rule formatter
+        self.rule_escalations = 0  # Records the rules flagged as ambiguous
+        self.cache = LRUCache(
+            max_entries=AGENT_CACHE_MAX_ENTRIES,
+            max_bytes=AGENT_CACHE_MAX_BYTES,
+            default_ttl=AGENT_CACHE_TTL_SECONDS
+        )
+        self.disk_cache = PersistentCache(
+            LLM_CACHE_PATH,
+            max_bytes=LLM_CACHE_MAX_BYTES,
+            default_ttl=LLM_CACHE_TTL_SECONDS
+        ) if LLM_CACHE_PATH else None
+        self.single_flight = SingleFlight()  # Dedupes concurrent misses on one key
+        self._broadcasts: Dict[str, FieldBroadcast] = {}  # cache key -> fields of an in-flight stream
+        
+        # Stale-while-revalidate: latest enhanced form per UUID, kept past the cache TTL
+        self.last_enhanced = LRUCache(
+            max_entries=AGENT_CACHE_MAX_ENTRIES,
+            max_bytes=AGENT_CACHE_MAX_BYTES,
+            default_ttl=0
+        )
+        self.refresh_tasks: Set[asyncio.Task] = set()
+        self.provisional_responses = 0
+        self.refreshes_started = 0
+        
+        # One pooled HTTP client shared by every request in this worker
+        self.http_client = DefaultAsyncHttpxClient(
+            limits=httpx.Limits(
+                max_connections=LLM_MAX_CONNECTIONS,
+                max_keepalive_connections=LLM_MAX_KEEPALIVE
+            )
+        )
+        
+        if backends is None:
+            provider = provider.lower()
+            defaults = BACKEND_DEFAULTS.get(provider, BACKEND_DEFAULTS["openai"])
+            backends = [{
+                "name": provider,
+                "base_url": defaults["base_url"],
+                "api_key": api_key if provider == "openai" else defaults["api_key"],
+                "model": model or defaults["model"]
+            }]
+        
+        # Fails over and hedges across backends; circuit breakers skip ones that are down
+        self.router = LLMRouter(backends, http_client=self.http_client)
+        self.provider = self.router.backends[0].name
+        # Cache keys use the primary model; fallback answers are cached under it too
+        self.model = self.router.model
+        # Priority queues, in-flight cap and rate limits in front of the router
+        self.scheduler = LLMScheduler()
+    
+    async def aclose(self):
+        """Cancel background refreshes and close the pooled HTTP connections held by the LLM client"""
+        for task in list(self.refresh_tasks):
+            task.cancel()
+        await asyncio.gather(*self.refresh_tasks, return_exceptions=True)
+        await self.router.aclose()
+    
+    async def invalidate(self, uuid: str) -> int:
+        """Drop every cached form response for a UUID after its record changes"""
+        removed = self.cache.invalidate_tag(uuid)
+        removed += int(self.last_enhanced.delete(uuid))
+        if self.disk_cache:
+            removed += await asyncio.to_thread(self.disk_cache.invalidate_tag, uuid)
+        return removed
+    
+    def warm_cache(self) -> int:
+        """Load recently used persisted responses into memory (call on startup)"""
+        if not self.disk_cache:
+            return 0
+        loaded = self.disk_cache.warm(self.cache, LLM_CACHE_WARM_ENTRIES)
+        print(f"✓ Warmed agent cache with {loaded} persisted responses")
+        return loaded
+    
+    async def get_metrics(self) -> Dict[str, Any]:
+        """Return agent-level cache metrics"""
+        # The persisted cache counts its rows with a query; keep it off the event loop
+        disk_cache = await asyncio.to_thread(self.disk_cache.stats) if self.disk_cache else None
+        return {
+            "cache": self.cache.stats(),
+            "disk_cache": disk_cache,
+            "single_flight": self.single_flight.stats(),
+            "router": self.router.stats(),
+            "scheduler": self.scheduler.stats(),
+            "stale_while_revalidate": {
+                "provisional_responses": self.provisional_responses,
+                "refreshes_started": self.refreshes_started,
+                "refreshes_in_flight": len(self.refresh_tasks)
+            },
+            "formatter": {
+                "policy": self.formatter_policy,
+                "completions_avoided": self.completions_avoided,
+                "escalated_to_llm": self.rule_escalations
+            }
+        }
+    
+    def _format_with_rules(self, uuid: str, raw_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Try the deterministic formatter according to the configured policy
+        
+        Returns:
+            Formatted fields, or None when the record must go to the LLM
+        """
+        if self.formatter_policy == POLICY_LLM_ALWAYS:
+            return None
+        
+        result, ambiguities = self.formatter.format(uuid, raw_data)
+        if ambiguities and self.formatter_policy != POLICY_RULES_ONLY:
+            self.rule_escalations += 1
+            return None
+        
+        self.completions_avoided += 1
+        return result
+    
+    def _cache_key(self, uuid: str, raw_data: Dict[str, Any]) -> str:
+        """
+        Build a cache key from model, prompt version and normalized input
+        
+        Whitespace differences in field values map to the same key so trivially
+        re-saved records still hit the cache.
         """
-        self.provider = provider.lower()
-        self.cache = {}  # Simple in-memory cache
-        
-        if self.provider == "lmstudio":
-            # LM Studio uses OpenAI-compatible API at localhost
-            self.client = OpenAI(
-                base_url="http://localhost:1234/v1",
-                api_key="lm-studio",
-                timeout=15.0  # 15 second timeout for complex operations
+        normalized = {
+            key: " ".join(value.split()) if isinstance(value, str) else value
+            for key, value in raw_data.items()
+        }
+        digest = hashlib.sha256(
+            f"{self.model}|{FORM_PROMPT_VERSION}|{json.dumps(normalized, sort_keys=True)}".encode()
+        ).hexdigest()
+        return f"{uuid}:{digest}"
+    
+    async def _get_cached(self, cache_key: str, uuid: str) -> Dict[str, Any]:
+        """Look up a response in memory, then in the persistent cache"""
+        cached = self.cache.get(cache_key)
+        if cached is None and self.disk_cache:
+            cached = await asyncio.to_thread(self.disk_cache.get, cache_key)
+            if cached is not None:
+                self.cache.set(cache_key, cached, tag=uuid)
+        return cached
+    
+    async def _store_cached(self, cache_key: str, uuid: str, result: Dict[str, Any]):
+        """Write a response to both cache tiers"""
+        self.cache.set(cache_key, result, tag=uuid)
+        self.last_enhanced.set(uuid, result)
+        if self.disk_cache:
+            await asyncio.to_thread(
+                self.disk_cache.set,
+                cache_key,
+                result,
+                tag=uuid,
+                model=self.model,
+                prompt_version=FORM_PROMPT_VERSION
             )
-            self.model = model or "gemma-3"  # Default to gemma-3 for LM Studio
-        else:
-            # OpenAI
-            self.client = OpenAI(
-                api_key=api_key,
-                timeout=15.0  # 15 second timeout
+    
+    async def _chat_json(self, system_prompt: str, user_prompt: str,
+                         temperature: float, max_tokens: int,
+                         priority: int = PRIORITY_BACKGROUND) -> Dict[str, Any]:
+        """
+        Run a JSON-mode chat completion without blocking the event loop
+        
+        Args:
+            system_prompt: System instructions for the model
+            user_prompt: User message content
+            temperature: Sampling temperature
+            max_tokens: Completion token limit
+            priority: Scheduler queue (PRIORITY_INTERACTIVE, _BATCH or _BACKGROUND)
+            
+        Returns:
+            Parsed JSON object from the completion
+        """
+        estimate = estimate_tokens(system_prompt, user_prompt, max_tokens=max_tokens)
+        async with self.scheduler.slot(priority, estimate) as record_usage:
+            response = await self.router.chat_completion(
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": user_prompt}
+                ],
+                response_format={"type": "json_object"},
+                temperature=temperature,
+                max_tokens=max_tokens
             )
-            self.model = model or "gpt-4o-mini"
+            if getattr(response, "usage", None) is not None:
+                record_usage(response.usage.total_tokens)
+        return json.loads(response.choices[0].message.content)
     
-    def map_uuid_to_form(self, uuid: str, raw_data: Dict[str, Any], use_llm: bool = True) -> Dict[str, Any]:
+    async def map_uuid_to_form(self, uuid: str, raw_data: Dict[str, Any], use_llm: bool = True,
+                               priority: int = PRIORITY_INTERACTIVE) -> Dict[str, Any]:
         """
         Use LLM to intelligently map and enhance UUID data to form fields
         
@@ -46,50 +266,121 @@ class UUIDAgent:
             uuid: The UUID identifier
             raw_data: Raw data from database
             use_llm: Whether to use LLM processing (default: True)
+            priority: Scheduler queue for the completion
             
         Returns:
             Dict with mapped form fields
         """
         
-        # Check cache first
-        cache_key = f"{uuid}_{hashlib.md5(json.dumps(raw_data, sort_keys=True).encode()).hexdigest()}"
-        if cache_key in self.cache:
-            print(f"Cache hit for UUID: {uuid}")
-            return self.cache[cache_key]
-        
         # If LLM is disabled, return raw data immediately
         if not use_llm:
             return self._format_raw_data(uuid, raw_data)
         
-        system_prompt = """You are a form-filling assistant. Format the data professionally and return JSON with these fields: uuid, name, email, phone, address, company, position, notes. Keep it concise."""
+        # Well-formed records are handled locally without a completion
+        ruled = self._format_with_rules(uuid, raw_data)
+        if ruled is not None:
+            return ruled
+        
+        # Check cache before escalating to the LLM
+        cache_key = self._cache_key(uuid, raw_data)
+        cached = await self._get_cached(cache_key, uuid)
+        if cached is not None:
+            print(f"Cache hit for UUID: {uuid}")
+            return cached
+        
+        # Concurrent misses for the same record share one completion
+        return await self.single_flight.do(
+            cache_key,
+            lambda: self._format_with_llm(uuid, raw_data, cache_key, priority)
+        )
+    
+    async def needs_completion(self, uuid: str, raw_data: Dict[str, Any]) -> bool:
+        """Whether map_uuid_to_form would call the LLM for this record (formatter counters untouched)"""
+        if self.formatter_policy == POLICY_RULES_ONLY:
+            return False
+        if self.formatter_policy != POLICY_LLM_ALWAYS:
+            _, ambiguities = self.formatter.format(uuid, raw_data)
+            if not ambiguities:
+                return False
+        return await self._get_cached(self._cache_key(uuid, raw_data), uuid) is None
+    
+    async def warm_record(self, uuid: str, raw_data: Dict[str, Any],
+                          priority: int = PRIORITY_BACKGROUND) -> Dict[str, Any]:
+        """
+        Complete a record that needs_completion reported, for the pre-warmer
+        
+        Skips the rule formatter so its counters in get_metrics reflect user
+        lookups only; a response cached in the meantime is returned as is.
+        """
+        cache_key = self._cache_key(uuid, raw_data)
+        cached = await self._get_cached(cache_key, uuid)
+        if cached is not None:
+            return cached
+        return await self.single_flight.do(
+            cache_key,
+            lambda: self._format_with_llm(uuid, raw_data, cache_key, priority)
+        )
+    
+    async def map_uuid_to_form_swr(self, uuid: str, raw_data: Dict[str, Any]) -> Tuple[Dict[str, Any], bool]:
+        """
+        Stale-while-revalidate variant of map_uuid_to_form
+        
+        Rule-formatted and cached records are returned as final. On a cache miss
+        the last enhanced version of the record (or the raw fields) is returned
+        at once and the LLM refinement runs in the background, so the next
+        lookup finds it in the cache.
+        
+        Returns:
+            (form fields, provisional) where provisional means a refinement is pending
+        """
+        ruled = self._format_with_rules(uuid, raw_data)
+        if ruled is not None:
+            return ruled, False
+        
+        cache_key = self._cache_key(uuid, raw_data)
+        cached = await self._get_cached(cache_key, uuid)
+        if cached is not None:
+            return cached, False
         
+        self._refresh_in_background(uuid, raw_data, cache_key)
+        self.provisional_responses += 1
+        last = self.last_enhanced.get(uuid)
+        return (dict(last) if last is not None else self._format_raw_data(uuid, raw_data)), True
+    
+    def _refresh_in_background(self, uuid: str, raw_data: Dict[str, Any], cache_key: str):
+        """Start an LLM refinement unless one for the same key is already running"""
+        if self.single_flight.in_flight(cache_key):
+            return
+        self.refreshes_started += 1
+        task = asyncio.create_task(
+            self.single_flight.do(
+                cache_key,
+                lambda: self._format_with_llm(uuid, raw_data, cache_key, PRIORITY_BATCH)
+            ),
+            name=f"swr-refresh-{uuid}"
+        )
+        # Hold a reference until done; the event loop only keeps weak ones
+        self.refresh_tasks.add(task)
+        task.add_done_callback(self.refresh_tasks.discard)
+    
+    async def _format_with_llm(self, uuid: str, raw_data: Dict[str, Any], cache_key: str,
+                               priority: int = PRIORITY_INTERACTIVE) -> Dict[str, Any]:
+        """Format a record with the LLM and cache the result"""
         user_prompt = f"""Format this data: {json.dumps(raw_data)}"""
         
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                response_format={"type": "json_object"},
+            result = await self._chat_json(
+                FORM_SYSTEM_PROMPT,
+                user_prompt,
                 temperature=0.1,  # Lower temperature for faster, more consistent results
-                max_tokens=500  # Limit tokens for faster response
+                max_tokens=500,  # Limit tokens for faster response
+                priority=priority
             )
             
-            result = json.loads(response.choices[0].message.content)
-            
-            # Ensure UUID is included
-            result["uuid"] = uuid
-            
-            # Ensure all required fields exist
-            required_fields = ["uuid", "name", "email", "phone", "address", "company", "position", "notes"]
-            for field in required_fields:
-                if field not in result:
-                    result[field] = raw_data.get(field, "")
+            result = self._complete_form(uuid, raw_data, result)
             
             # Cache the result
-            self.cache[cache_key] = result
+            await self._store_cached(cache_key, uuid, result)
             
             return result
             
@@ -98,6 +389,231 @@ class UUIDAgent:
             # Fallback to raw data if agent fails
             return self._format_raw_data(uuid, raw_data)
     
+    def _complete_form(self, uuid: str, raw_data: Dict[str, Any], result: Dict[str, Any]) -> Dict[str, Any]:
+        """Pin the UUID and fill any field the model left out from the raw record"""
+        result["uuid"] = uuid
+        for field in FORM_FIELDS:
+            if field not in result:
+                result[field] = raw_data.get(field, "")
+        return result
+    
+    async def _chat_json_stream(self, system_prompt: str, user_prompt: str,
+                                temperature: float, max_tokens: int,
+                                priority: int = PRIORITY_INTERACTIVE) -> AsyncIterator[str]:
+        """
+        Run a JSON-mode chat completion with streaming enabled
+        
+        The scheduler slot is held until the stream is fully read, and the
+        token bucket is corrected from the usage reported in the last chunk
+        (the admission estimate stands if the backend reports none).
+        
+        Yields:
+            Content deltas as the model produces them
+        """
+        estimate = estimate_tokens(system_prompt, user_prompt, max_tokens=max_tokens)
+        async with self.scheduler.slot(priority, estimate) as record_usage:
+            stream = await self.router.chat_completion_stream(
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": user_prompt}
+                ],
+                response_format={"type": "json_object"},
+                temperature=temperature,
+                max_tokens=max_tokens,
+                stream_options={"include_usage": True}
+            )
+            try:
+                async for chunk in stream:
+                    if getattr(chunk, "usage", None) is not None:
+                        record_usage(chunk.usage.total_tokens)
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
+            finally:
+                # Release the HTTP connection now, not when the generator is collected
+                await stream.close()
+    
+    async def stream_uuid_to_form(self, uuid: str, raw_data: Dict[str, Any], use_llm: bool = True,
+                                  swr: bool = False) -> AsyncIterator[Tuple[str, Any]]:
+        """
+        Streaming variant of map_uuid_to_form
+        
+        Yields ("raw", fields) straight away, then ("field", (name, value)) for
+        each form field as the LLM completion finishes it, and finally
+        ("done", fields). Records resolved by the rule formatter or the cache
+        skip straight to "done"; a failed completion ends with the raw fields.
+        Concurrent lookups of one record share a single completion, whether
+        they stream or not.
+        
+        Args:
+            uuid: The UUID identifier
+            raw_data: Raw data from database
+            use_llm: Whether to use LLM processing (default: True)
+            swr: Answer a cache miss like map_uuid_to_form_swr, ending with a
+                provisional "done" instead of streaming the completion
+        """
+        raw = self._format_raw_data(uuid, raw_data)
+        yield "raw", raw
+        
+        if not use_llm:
+            yield "done", raw
+            return
+        
+        if swr:
+            result, provisional = await self.map_uuid_to_form_swr(uuid, raw_data)
+            yield "done", {**result, "provisional": provisional}
+            return
+        
+        ruled = self._format_with_rules(uuid, raw_data)
+        if ruled is not None:
+            yield "done", ruled
+            return
+        
+        cache_key = self._cache_key(uuid, raw_data)
+        cached = await self._get_cached(cache_key, uuid)
+        if cached is not None:
+            yield "done", cached
+            return
+        
+        broadcast = self._broadcasts.get(cache_key)
+        if broadcast is None and self.single_flight.in_flight(cache_key):
+            # A non-streaming completion for this record is running; wait for its result
+            yield "done", await self.single_flight.do(
+                cache_key,
+                lambda: self._format_with_llm(uuid, raw_data, cache_key)
+            )
+            return
+        if broadcast is None:
+            broadcast = FieldBroadcast()
+            self._broadcasts[cache_key] = broadcast
+        # Starts the completion, or joins it; non-streaming lookups coalesce onto it too
+        self.single_flight.start(
+            cache_key,
+            lambda: self._stream_with_llm(uuid, raw_data, cache_key, broadcast)
+        )
+        
+        fields = broadcast.listen()
+        try:
+            async for field, value in fields:
+                yield "field", (field, value)
+        finally:
+            await fields.aclose()
+        yield "done", broadcast.result if broadcast.result is not None else raw
+    
+    async def _stream_with_llm(self, uuid: str, raw_data: Dict[str, Any], cache_key: str,
+                               broadcast: FieldBroadcast) -> Dict[str, Any]:
+        """Stream a completion into broadcast, cache the result and return it"""
+        result = self._format_raw_data(uuid, raw_data)
+        parser = JSONFieldStream()
+        deltas = self._chat_json_stream(
+            FORM_SYSTEM_PROMPT,
+            f"""Format this data: {json.dumps(raw_data)}""",
+            temperature=0.1,
+            max_tokens=500
+        )
+        try:
+            try:
+                async for delta in deltas:
+                    for field, value in parser.feed(delta):
+                        if field in FORM_FIELDS and field != "uuid":
+                            broadcast.publish(field, value)
+            finally:
+                # Release the completion stream and its scheduler slot even when cancelled
+                await deltas.aclose()
+            result = self._complete_form(uuid, raw_data, json.loads(parser.text))
+            await self._store_cached(cache_key, uuid, result)
+        except Exception as e:
+            print(f"Agent stream error (falling back to raw data): {str(e)}")
+        finally:
+            self._broadcasts.pop(cache_key, None)
+            broadcast.close(result)
+        return result
+    
+    async def map_uuids_to_forms(self, records: Dict[str, Dict[str, Any]],
+                                 use_llm: bool = True) -> Dict[str, Dict[str, Any]]:
+        """
+        Format many records, packing cache misses into a few batched completions
+        
+        Args:
+            records: Mapping of UUID to raw data from database
+            use_llm: Whether to use LLM processing (default: True)
+            
+        Returns:
+            Dict mapping each UUID to its formatted form fields
+        """
+        results = {}
+        pending = []
+        
+        for uuid, raw_data in records.items():
+            if not use_llm:
+                results[uuid] = self._format_raw_data(uuid, raw_data)
+                continue
+            
+            ruled = self._format_with_rules(uuid, raw_data)
+            if ruled is not None:
+                results[uuid] = ruled
+                continue
+            
+            cache_key = self._cache_key(uuid, raw_data)
+            cached = await self._get_cached(cache_key, uuid)
+            if cached is not None:
+                results[uuid] = cached
+            else:
+                pending.append((uuid, raw_data, cache_key))
+        
+        batches = [
+            pending[i:i + FORM_BATCH_SIZE]
+            for i in range(0, len(pending), FORM_BATCH_SIZE)
+        ]
+        for batch_results in await asyncio.gather(
+            *[self._format_batch_with_llm(batch) for batch in batches]
+        ):
+            results.update(batch_results)
+        
+        return results
+    
+    async def _format_batch_with_llm(self, batch: List[tuple]) -> Dict[str, Dict[str, Any]]:
+        """
+        Format several records in one completion with a JSON array response
+        
+        Records missing or malformed in the response fall back to raw data
+        individually; the rest of the batch is still used and cached.
+        """
+        system_prompt = """You are a form-filling assistant. Format each record professionally. Return JSON with a "records" array containing one object per input record, each with these fields: uuid, name, email, phone, address, company, position, notes. Copy each uuid exactly as given. Keep it concise."""
+        
+        user_prompt = f"""Format these records: {json.dumps([{"uuid": uuid, **raw_data} for uuid, raw_data, _ in batch])}"""
+        
+        formatted = {}
+        try:
+            response = await self._chat_json(
+                system_prompt,
+                user_prompt,
+                temperature=0.1,
+                max_tokens=min(350 * len(batch), 4000),
+                priority=PRIORITY_BATCH
+            )
+            for item in response.get("records", []):
+                if isinstance(item, dict) and item.get("uuid"):
+                    formatted[str(item["uuid"])] = item
+        except Exception as e:
+            print(f"Batch agent error (falling back to raw data): {str(e)}")
+        
+        results = {}
+        for uuid, raw_data, cache_key in batch:
+            item = formatted.get(uuid)
+            if item is None:
+                results[uuid] = self._format_raw_data(uuid, raw_data)
+                continue
+            
+            result = {
+                field: str(item[field]) if item.get(field) is not None else raw_data.get(field, "")
+                for field in FORM_FIELDS
+            }
+            result["uuid"] = uuid
+            await self._store_cached(cache_key, uuid, result)
+            results[uuid] = result
+        
+        return results
+    
     def _format_raw_data(self, uuid: str, raw_data: Dict[str, Any]) -> Dict[str, Any]:
         """Format raw data without LLM processing"""
         return {
@@ -111,68 +627,70 @@ class UUIDAgent:
             "notes": raw_data.get("notes", "")
         }
     
-    def detect_duplicates_intelligently(self, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    async def adjudicate_duplicate_pairs(self, pairs: List[Dict[str, Any]],
+                                         records: Dict[str, Dict[str, Any]]) -> List[Dict[str, Any]]:
         """
-        Use LLM to intelligently detect duplicate records based on semantic similarity
+        Use LLM to decide borderline candidate pairs from the local engine
         
         Args:
-            records: List of form data records
+            pairs: Candidate pairs (uuid1, uuid2, confidence, reason, type)
+            records: Mapping of UUID to record data
             
         Returns:
-            List of duplicate pairs with reasoning
+            Pairs the LLM confirmed as duplicates
         """
-        if len(records) < 2:
-            return []
-        
-        # Prepare records for analysis (limit to prevent token overflow)
-        records_summary = [
-            {
-                "uuid": r.get("uuid", ""),
+        def summarize(uuid: str) -> Dict[str, Any]:
+            r = records.get(uuid, {})
+            return {
+                "uuid": uuid,
                 "name": r.get("name", ""),
                 "email": r.get("email", ""),
                 "company": r.get("company", ""),
                 "position": r.get("position", "")
             }
-            for r in records[:50]  # Limit to 50 records for performance
+        
+        candidates = [
+            {"record1": summarize(p["uuid1"]), "record2": summarize(p["uuid2"])}
+            for p in pairs
         ]
         
         system_prompt = """You are an intelligent duplicate detection system for hospital records. 
-        Analyze the provided records and identify potential duplicates based on:
+        Each candidate is a pair of records that a matching engine found similar. Decide whether
+        each pair is the same person, considering:
         - Name similarity (including typos, abbreviations, nicknames)
         - Email similarity
         - Same person at different positions or companies
         - Professional context (doctors, patients, workers)
         
-        Return a JSON object with a "duplicates" array. Each duplicate should have:
-        - uuid1, uuid2: The UUIDs of potential duplicates
+        Return a JSON object with a "duplicates" array containing only the confirmed pairs. Each should have:
+        - uuid1, uuid2: The UUIDs of the pair
         - confidence: 0.0-1.0 (0.85+ is high confidence)
-        - reason: Brief explanation why they might be duplicates
+        - reason: Brief explanation why they are duplicates
         - type: "exact_match", "likely_duplicate", "possible_duplicate"
+        """
         
-        Only report pairs with confidence >= 0.75."""
-        
-        user_prompt = f"""Analyze these records for duplicates:\n{json.dumps(records_summary, indent=2)}"""
+        user_prompt = f"""Adjudicate these candidate pairs:\n{json.dumps(candidates, indent=2)}"""
         
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                response_format={"type": "json_object"},
+            result = await self._chat_json(
+                system_prompt,
+                user_prompt,
                 temperature=0.2,
                 max_tokens=1500
             )
             
-            result = json.loads(response.choices[0].message.content)
-            return result.get("duplicates", [])
+            # Only accept verdicts about pairs we actually asked about
+            asked = {frozenset((p["uuid1"], p["uuid2"])) for p in pairs}
+            return [
+                d for d in result.get("duplicates", [])
+                if frozenset((d.get("uuid1"), d.get("uuid2"))) in asked
+            ]
             
         except Exception as e:
-            print(f"Duplicate detection error: {str(e)}")
+            print(f"Duplicate adjudication error: {str(e)}")
             return []
     
-    def identify_stale_records_intelligently(self, records: List[Dict[str, Any]]) -> Dict[str, Any]:
+    async def identify_stale_records_intelligently(self, records: List[Dict[str, Any]]) -> Dict[str, Any]:
         """
         Use LLM to intelligently analyze records and identify stale/outdated ones
         
@@ -213,25 +731,19 @@ class UUIDAgent:
         user_prompt = f"""Analyze these records:\n{json.dumps(records_summary, indent=2)}"""
         
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                response_format={"type": "json_object"},
+            result = await self._chat_json(
+                system_prompt,
+                user_prompt,
                 temperature=0.3,
                 max_tokens=1500
             )
-            
-            result = json.loads(response.choices[0].message.content)
             return result
             
         except Exception as e:
             print(f"Stale record analysis error: {str(e)}")
             return {"stale_records": [], "recommendations": []}
     
-    def analyze_user_behavior(self, interactions: List[Dict[str, Any]]) -> Dict[str, Any]:
+    async def analyze_user_behavior(self, interactions: List[Dict[str, Any]]) -> Dict[str, Any]:
         """
         Use LLM to analyze user behavior patterns and provide personalized insights
         
@@ -277,18 +789,12 @@ class UUIDAgent:
         user_prompt = f"""Analyze these user interactions:\n{json.dumps(interaction_summary, indent=2)}"""
         
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                response_format={"type": "json_object"},
+            result = await self._chat_json(
+                system_prompt,
+                user_prompt,
                 temperature=0.3,
                 max_tokens=1000
             )
-            
-            result = json.loads(response.choices[0].message.content)
             return result
             
         except Exception as e:
@@ -299,7 +805,7 @@ class UUIDAgent:
                 "summary": "Analysis unavailable"
             }
     
-    def provide_smart_suggestions(self, current_form: Dict[str, Any], 
+    async def provide_smart_suggestions(self, current_form: Dict[str, Any], 
                                  user_history: List[Dict[str, Any]]) -> Dict[str, Any]:
         """
         Provide intelligent field suggestions based on current context and user history
@@ -327,18 +833,13 @@ class UUIDAgent:
         User history: {json.dumps(user_history[-10:], indent=2)}"""
         
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                response_format={"type": "json_object"},
+            result = await self._chat_json(
+                system_prompt,
+                user_prompt,
                 temperature=0.3,
-                max_tokens=800
+                max_tokens=800,
+                priority=PRIORITY_INTERACTIVE
             )
-            
-            result = json.loads(response.choices[0].message.content)
             return result
             
         except Exception as e:
@@ -0,0 +1,135 @@
+"""
+Benchmark SQLite read/write throughput for each engine profile in database.py.
+
+Mimics the API's hot paths on a scratch database: readers load a record by
+UUID (get-form-data) while writers bump access counts and insert interactions
+(record-interaction), each committing per operation.
+
+Usage:
+    python benchmark_db.py [--records 5000] [--readers 8] [--writers 4] [--seconds 5]
+"""
+
+from datetime import datetime
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from database import PROFILES, create_sqlite_engine
+from migrations import run_migrations
+from models import FormData, FormInteraction
+
+
+def seed(Session, records: int) -> list:
+    db = Session()
+    try:
+        uuids = [str(uuid.uuid4()) for _ in range(records)]
+        db.bulk_insert_mappings(FormData, [
+            {
+                "uuid": u,
+                "name": f"Benchmark User {i}",
+                "email": f"user{i}@example.com",
+                "phone": f"+1-555-{i:04d}",
+                "company": "Benchmark Hospital",
+                "position": "Patient"
+            }
+            for i, u in enumerate(uuids)
+        ])
+        db.commit()
+        return uuids
+    finally:
+        db.close()
+
+
+def run_profile(profile: str, args) -> dict:
+    directory = tempfile.mkdtemp(prefix="benchmark_db_")
+    engine = create_sqlite_engine(f"sqlite:///{os.path.join(directory, 'bench.db')}", profile)
+    try:
+        run_migrations(engine)
+        Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        uuids = seed(Session, args.records)
+
+        counts = {"reads": 0, "writes": 0, "errors": 0}
+        lock = threading.Lock()
+        deadline = time.perf_counter() + args.seconds
+
+        def reader():
+            done = 0
+            while time.perf_counter() < deadline:
+                db = Session()
+                try:
+                    db.query(FormData).filter(FormData.uuid == random.choice(uuids)).first()
+                    done += 1
+                finally:
+                    db.close()
+            with lock:
+                counts["reads"] += done
+
+        def writer():
+            done = errors = 0
+            while time.perf_counter() < deadline:
+                db = Session()
+                try:
+                    record = db.query(FormData).filter(FormData.uuid == random.choice(uuids)).first()
+                    record.access_count = (record.access_count or 0) + 1
+                    record.last_accessed = datetime.utcnow()
+                    db.add(FormInteraction(uuid=record.uuid, field_name="name", interaction_type="view"))
+                    db.commit()
+                    done += 1
+                except OperationalError:
+                    db.rollback()
+                    errors += 1
+                finally:
+                    db.close()
+            with lock:
+                counts["writes"] += done
+                counts["errors"] += errors
+
+        threads = [threading.Thread(target=reader) for _ in range(args.readers)]
+        threads += [threading.Thread(target=writer) for _ in range(args.writers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        engine.dispose()
+        # The database, WAL and shared-memory files all live in the scratch directory
+        shutil.rmtree(directory, ignore_errors=True)
+
+    return {
+        "reads_per_sec": counts["reads"] / args.seconds,
+        "writes_per_sec": counts["writes"] / args.seconds,
+        "lock_errors": counts["errors"]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, default=5000)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print(f"SQLite benchmark: {args.readers} readers, {args.writers} writers, {args.seconds}s")
+    print("=" * 60)
+    for profile in ("default", "tuned"):
+        result = run_profile(profile, args)
+        print(
+            f"{profile:>8}: {result['reads_per_sec']:8.0f} reads/s  "
+            f"{result['writes_per_sec']:8.0f} writes/s  "
+            f"{result['lock_errors']} lock errors"
+        )
+    print(f"\nTuned pragmas: {PROFILES['tuned']}")
+
+
+if __name__ == "__main__":
+    main()
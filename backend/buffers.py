@@ -0,0 +1,243 @@
+from typing import Dict, Any, List, Optional, Tuple
+from abc import ABC, abstractmethod
+from datetime import datetime
+import asyncio
+import threading
+import time
+
+from sqlalchemy import update, insert, bindparam, func
+
+from models import FormData, FormInteraction
+
+
+class WriteBehindBuffer(ABC):
+    """
+    Base for in-memory buffers that a background task writes out in batches
+
+    Subclasses keep their own pending structure and implement _take, _write,
+    _restore and _size. Pending data is flushed on shutdown and put back if a
+    flush fails.
+    """
+
+    def __init__(self, session_factory, flush_interval: float = 5.0, max_pending: int = 5000):
+        """
+        Args:
+            session_factory: Callable returning a new database session
+            flush_interval: Seconds between flushes
+            max_pending: Pending items before an early flush is triggered
+        """
+        self.session_factory = session_factory
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+
+        self._lock = threading.Lock()
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+        self.recorded = 0
+        self.flushes = 0
+        self.rows_flushed = 0
+        self.failures = 0
+        self.last_flush_ms = 0.0
+
+    async def start(self):
+        """Start the periodic flush task"""
+        self._wake = asyncio.Event()
+        self._task = asyncio.create_task(self._run(), name=f"{type(self).__name__}-flush")
+
+    async def stop(self):
+        """Stop the flush task and write whatever is still pending"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush()
+
+    async def flush(self) -> int:
+        """Write pending data now; returns the number of rows written"""
+        with self._lock:
+            batch = self._take()
+        if not batch:
+            return 0
+
+        started = time.perf_counter()
+        try:
+            await asyncio.to_thread(self._write, batch)
+        except Exception as e:
+            self.failures += 1
+            print(f"{type(self).__name__} flush error: {str(e)}")
+            with self._lock:
+                self._restore(batch)
+            return 0
+
+        self.flushes += 1
+        self.rows_flushed += len(batch)
+        self.last_flush_ms = round((time.perf_counter() - started) * 1000, 2)
+        return len(batch)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return buffer depth and flush counters"""
+        with self._lock:
+            pending = self._size()
+        return {
+            "pending": pending,
+            "recorded": self.recorded,
+            "flushes": self.flushes,
+            "rows_flushed": self.rows_flushed,
+            "failures": self.failures,
+            "last_flush_ms": self.last_flush_ms
+        }
+
+    def _notify(self, pending: int):
+        """Wake the flush task early once enough is pending"""
+        if pending >= self.max_pending and self._wake is not None:
+            self._wake.set()
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            await self.flush()
+
+    # --- Implemented by subclasses (_take, _restore and _size run under the lock) ---
+
+    @abstractmethod
+    def _take(self):
+        """Remove and return everything pending"""
+
+    @abstractmethod
+    def _restore(self, batch):
+        """Put back a batch that failed to write"""
+
+    @abstractmethod
+    def _size(self) -> int:
+        """Number of pending items"""
+
+    @abstractmethod
+    def _write(self, batch):
+        """Persist a batch (runs in a worker thread)"""
+
+
+class AccessStatsBuffer(WriteBehindBuffer):
+    """
+    Write-behind buffer for FormData access_count / last_accessed
+
+    Lookups only record the access in memory; each flush folds the pending
+    counts into one executemany UPDATE, so a burst of reads costs one commit
+    instead of one per request.
+    """
+
+    def __init__(self, session_factory, flush_interval: float = 5.0, max_pending: int = 5000):
+        super().__init__(session_factory, flush_interval, max_pending)
+        self._pending: Dict[str, Tuple[int, datetime]] = {}  # uuid -> (count, last access)
+
+    def record(self, uuid: str, when: Optional[datetime] = None):
+        """Count one access to a record"""
+        when = when or datetime.utcnow()
+        with self._lock:
+            count, last = self._pending.get(uuid, (0, when))
+            self._pending[uuid] = (count + 1, max(last, when))
+            self.recorded += 1
+            pending = len(self._pending)
+        self._notify(pending)
+
+    def _take(self) -> Dict[str, Tuple[int, datetime]]:
+        batch, self._pending = self._pending, {}
+        return batch
+
+    def _restore(self, batch: Dict[str, Tuple[int, datetime]]):
+        for uuid, (count, last) in batch.items():
+            pending_count, pending_last = self._pending.get(uuid, (0, last))
+            self._pending[uuid] = (pending_count + count, max(pending_last, last))
+
+    def _size(self) -> int:
+        return len(self._pending)
+
+    def _write(self, batch: Dict[str, Tuple[int, datetime]]):
+        params: List[Dict[str, Any]] = [
+            {"b_uuid": uuid, "b_count": count, "b_last": last}
+            for uuid, (count, last) in batch.items()
+        ]
+        statement = update(FormData.__table__).where(
+            FormData.__table__.c.uuid == bindparam("b_uuid")
+        ).values(
+            access_count=func.coalesce(FormData.__table__.c.access_count, 0) + bindparam("b_count"),
+            last_accessed=bindparam("b_last")
+        )
+
+        db = self.session_factory()
+        try:
+            # One executemany in a single transaction for the whole batch
+            db.connection().execute(statement, params)
+            db.commit()
+        finally:
+            db.close()
+
+
+class InteractionBuffer(WriteBehindBuffer):
+    """
+    Append buffer for FormInteraction telemetry
+
+    Interactions are queued in memory and inserted on each flush with
+    executemany calls of at most chunk_size rows, in one transaction.
+    """
+
+    def __init__(self, session_factory, flush_interval: float = 2.0, max_pending: int = 2000,
+                 chunk_size: int = 1000):
+        """
+        Args:
+            chunk_size: Rows per executemany call
+        """
+        super().__init__(session_factory, flush_interval, max_pending)
+        self.chunk_size = chunk_size
+        self._pending: List[Dict[str, Any]] = []
+
+    def append(self, interactions: List[Dict[str, Any]]):
+        """
+        Queue interactions for insertion
+
+        Args:
+            interactions: Dicts with uuid, field_name, interaction_type and
+                optional original_value, corrected_value and timestamp
+        """
+        now = datetime.utcnow()
+        rows = [
+            {
+                "uuid": item["uuid"],
+                "field_name": item["field_name"],
+                "interaction_type": item["interaction_type"],
+                "original_value": item.get("original_value"),
+                "corrected_value": item.get("corrected_value"),
+                "timestamp": item.get("timestamp") or now
+            }
+            for item in interactions
+        ]
+        with self._lock:
+            self._pending.extend(rows)
+            self.recorded += len(rows)
+            pending = len(self._pending)
+        self._notify(pending)
+
+    def _take(self) -> List[Dict[str, Any]]:
+        batch, self._pending = self._pending, []
+        return batch
+
+    def _restore(self, batch: List[Dict[str, Any]]):
+        self._pending[:0] = batch
+
+    def _size(self) -> int:
+        return len(self._pending)
+
+    def _write(self, batch: List[Dict[str, Any]]):
+        statement = insert(FormInteraction.__table__)
+        db = self.session_factory()
+        try:
+            # Whole batch in one transaction so a failed flush can be retried without duplicates
+            for start in range(0, len(batch), self.chunk_size):
+                db.connection().execute(statement, batch[start:start + self.chunk_size])
+            db.commit()
+        finally:
+            db.close()
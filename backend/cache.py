@@ -0,0 +1,393 @@
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+
+
+class LRUCache:
+    """Bounded in-memory cache with LRU eviction, per-entry TTL and usage counters"""
+
+    def __init__(self, max_entries: int = 10000, max_bytes: int = 64 * 1024 * 1024,
+                 default_ttl: float = 3600.0):
+        """
+        Initialize the cache
+
+        Args:
+            max_entries: Maximum number of entries kept before evicting
+            max_bytes: Approximate memory budget (JSON-encoded size of values)
+            default_ttl: Seconds an entry stays valid (0 disables expiry)
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+
+        self._entries = OrderedDict()  # key -> (value, expires_at, size, tag)
+        self._tags: Dict[str, Set[str]] = {}  # tag (e.g. UUID) -> keys
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value or None if missing/expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            value, expires_at, _, _ = entry
+            if expires_at and expires_at < time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None, tag: Optional[str] = None):
+        """
+        Store a value, evicting least recently used entries if over budget
+
+        Args:
+            key: Cache key
+            value: JSON-serializable value
+            ttl: Override for the default TTL in seconds
+            tag: Optional group name used for bulk invalidation
+        """
+        ttl = self.default_ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl else 0
+        size = len(json.dumps(value, default=str))
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+            self._entries[key] = (value, expires_at, size, tag)
+            self._bytes += size
+            if tag is not None:
+                self._tags.setdefault(tag, set()).add(key)
+
+            while self._entries and (
+                len(self._entries) > self.max_entries or self._bytes > self.max_bytes
+            ):
+                oldest_key = next(iter(self._entries))
+                self._remove(oldest_key)
+                self.evictions += 1
+
+    def delete(self, key: str) -> bool:
+        """Remove a single entry"""
+        with self._lock:
+            if key not in self._entries:
+                return False
+            self._remove(key)
+            self.invalidations += 1
+            return True
+
+    def invalidate_tag(self, tag: str) -> int:
+        """Remove every entry stored under a tag, returning how many were dropped"""
+        with self._lock:
+            keys = list(self._tags.get(tag, ()))
+            for key in keys:
+                self._remove(key)
+            self.invalidations += len(keys)
+            return len(keys)
+
+    def clear(self):
+        """Drop all entries (counters are kept)"""
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Return cache size and hit/miss/eviction counters"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations
+            }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _remove(self, key: str):
+        """Remove an entry and its bookkeeping (caller holds the lock)"""
+        _, _, size, tag = self._entries.pop(key)
+        self._bytes -= size
+        if tag is not None:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+
+class PersistentCache:
+    """
+    SQLite-backed key-value cache shared by all workers and kept across restarts
+
+    Each thread gets its own connection; WAL journaling lets several uvicorn
+    workers read concurrently while one writes.
+    """
+
+    COMPACT_EVERY = 100  # Check the size budget every N writes
+
+    def __init__(self, path: str, max_bytes: int = 256 * 1024 * 1024,
+                 default_ttl: float = 7 * 24 * 3600.0):
+        """
+        Open (and create if needed) the cache database
+
+        Args:
+            path: SQLite file path
+            max_bytes: Size budget enforced by compaction
+            default_ttl: Seconds an entry stays valid (0 disables expiry)
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._writes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.compactions = 0
+        self.compacted_entries = 0
+
+        conn = self._connect()
+        # auto_vacuum only takes effect when set before the first table exists
+        conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                tag TEXT,
+                model TEXT,
+                prompt_version TEXT,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                expires_at REAL NOT NULL DEFAULT 0
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_llm_cache_tag ON llm_cache (tag)")
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_llm_cache_accessed ON llm_cache (accessed_at)")
+        conn.commit()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Return this thread's connection, opening it on first use"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=5000")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the stored value or None if missing/expired"""
+        conn = self._connect()
+        now = time.time()
+        row = conn.execute(
+            "SELECT value, expires_at, accessed_at FROM llm_cache WHERE key = ?", (key,)
+        ).fetchone()
+
+        if row is None or (row[1] and row[1] < now):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        # Refresh recency at most once a minute to keep reads mostly read-only
+        if row[2] < now - 60:
+            conn.execute("UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (now, key))
+            conn.commit()
+
+        with self._lock:
+            self.hits += 1
+        return json.loads(row[0])
+
+    def set(self, key: str, value: Any, tag: Optional[str] = None, model: str = "",
+            prompt_version: str = "", ttl: Optional[float] = None):
+        """
+        Store a value and compact the file when it outgrows its budget
+
+        Args:
+            key: Cache key
+            value: JSON-serializable value
+            tag: Optional group name used for bulk invalidation
+            model: Model that produced the value
+            prompt_version: Prompt template version that produced the value
+            ttl: Override for the default TTL in seconds
+        """
+        ttl = self.default_ttl if ttl is None else ttl
+        now = time.time()
+        payload = json.dumps(value, default=str)
+
+        conn = self._connect()
+        conn.execute(
+            """
+            INSERT OR REPLACE INTO llm_cache
+                (key, tag, model, prompt_version, value, size, created_at, accessed_at, expires_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (key, tag, model, prompt_version, payload, len(payload), now, now, now + ttl if ttl else 0)
+        )
+        conn.commit()
+
+        with self._lock:
+            self._writes += 1
+            should_compact = self._writes % self.COMPACT_EVERY == 0
+        if should_compact:
+            self.compact()
+
+    def invalidate_tag(self, tag: str) -> int:
+        """Remove every entry stored under a tag"""
+        conn = self._connect()
+        cursor = conn.execute("DELETE FROM llm_cache WHERE tag = ?", (tag,))
+        conn.commit()
+        return cursor.rowcount
+
+    def compact(self) -> int:
+        """
+        Drop expired entries, then least recently used ones until under budget
+
+        Returns:
+            Number of entries removed
+        """
+        conn = self._connect()
+        removed = conn.execute(
+            "DELETE FROM llm_cache WHERE expires_at > 0 AND expires_at < ?", (time.time(),)
+        ).rowcount
+        removed += conn.execute(
+            """
+            DELETE FROM llm_cache WHERE key IN (
+                SELECT key FROM (
+                    SELECT key, SUM(size) OVER (ORDER BY accessed_at DESC, key) AS running
+                    FROM llm_cache
+                ) WHERE running > ?
+            )
+            """,
+            (self.max_bytes,)
+        ).rowcount
+        conn.commit()
+
+        if removed:
+            conn.execute("PRAGMA incremental_vacuum")
+            with self._lock:
+                self.compactions += 1
+                self.compacted_entries += removed
+        return removed
+
+    def warm(self, target: LRUCache, limit: int) -> int:
+        """
+        Load the most recently used entries into an in-memory cache
+
+        Args:
+            target: Cache to populate
+            limit: Maximum number of entries to load
+
+        Returns:
+            Number of entries loaded
+        """
+        if limit <= 0:
+            return 0
+        rows = self._connect().execute(
+            """
+            SELECT key, tag, value FROM llm_cache
+            WHERE expires_at = 0 OR expires_at > ?
+            ORDER BY accessed_at DESC LIMIT ?
+            """,
+            (time.time(), limit)
+        ).fetchall()
+
+        # Insert oldest first so the hottest entries end up most recently used
+        for key, tag, value in reversed(rows):
+            target.set(key, json.loads(value), tag=tag)
+        return len(rows)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return on-disk size and hit/miss/compaction counters"""
+        entries, size = self._connect().execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_cache"
+        ).fetchone()
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "path": self.path,
+                "entries": entries,
+                "bytes": size,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "compactions": self.compactions,
+                "compacted_entries": self.compacted_entries
+            }
+
+
+class SingleFlight:
+    """Coalesce concurrent calls that share a key into one in-flight execution"""
+
+    def __init__(self):
+        self._in_flight: Dict[str, asyncio.Task] = {}
+        self.executions = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run fn() once per key; concurrent callers await the same result
+
+        Args:
+            key: Deduplication key (e.g. the response cache key)
+            fn: Zero-argument coroutine factory performing the work
+
+        Returns:
+            The shared result (or raises the shared exception)
+        """
+        # Shield so one caller disconnecting does not cancel the work for the others
+        return await asyncio.shield(self.start(key, fn))
+
+    def start(self, key: str, fn: Callable[[], Awaitable[Any]]) -> asyncio.Task:
+        """Return the in-flight task for key, starting fn() if there is none"""
+        task = self._in_flight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            task = asyncio.ensure_future(fn())
+            self._in_flight[key] = task
+            self.executions += 1
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        return task
+
+    def in_flight(self, key: str) -> bool:
+        """Whether a call for key is currently running"""
+        return key in self._in_flight
+
+    def stats(self) -> Dict[str, Any]:
+        """Return execution and coalescing counters"""
+        return {
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._in_flight)
+        }
@@ -1,22 +1,128 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from models import Base, FormData
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker
+from models import FormData
+from migrations import run_migrations
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from functools import partial
+from typing import Any, AsyncIterator, Callable
+import asyncio
+import os
 import uuid
 
 # SQLite database file
 DATABASE_URL = "sqlite:///./uuid_forms.db"
 
-engine = create_engine(
-    DATABASE_URL, 
-    connect_args={"check_same_thread": False}
-)
+# Connection pragmas per profile; "default" leaves SQLite's own settings
+PROFILES = {
+    "tuned": {
+        "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),  # Readers no longer block the writer
+        "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),  # fsync at checkpoints, not every commit
+        "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))),
+        "cache_size": -int(os.getenv("SQLITE_CACHE_KB", "65536")),  # Negative means KiB
+        "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000")),  # Wait for locks instead of failing
+        "temp_store": "MEMORY"
+    },
+    "default": {}
+}
+SQLITE_PROFILE = os.getenv("SQLITE_PROFILE", "tuned").lower()
+
+
+def create_sqlite_engine(url: str = DATABASE_URL, profile: str = SQLITE_PROFILE) -> Engine:
+    """
+    Create a SQLite engine with the given pragma profile and a pooled set of connections
+
+    Args:
+        url: SQLAlchemy database URL
+        profile: Key of PROFILES to apply on every new connection
+    """
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown SQLITE_PROFILE: {profile}")
+    pragmas = PROFILES[profile]
+
+    engine = create_engine(
+        url,
+        connect_args={
+            "check_same_thread": False,
+            # Python-level lock wait; matches busy_timeout when tuned
+            "timeout": pragmas.get("busy_timeout", 5000) / 1000
+        },
+        pool_size=int(os.getenv("DB_POOL_SIZE", "10")),
+        max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "20")),
+        pool_timeout=30
+    )
+
+    @event.listens_for(engine, "connect")
+    def apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+    return engine
+
+
+engine = create_sqlite_engine()
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Dedicated threads for blocking database work, sized to the connection pool
+db_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("DB_THREADS", os.getenv("DB_POOL_SIZE", "10"))),
+    thread_name_prefix="db"
+)
+
+
+class AsyncDB:
+    """
+    Async wrapper around a Session whose work runs on the database thread pool
+
+    Handlers pass a function taking the session, so a query, its edits and the
+    commit run off the event loop as one unit. A session is only used by one
+    request at a time, so it can safely hop between pool threads.
+    """
+
+    def __init__(self, session: Session):
+        self.session = session
+
+    async def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Call fn(session, *args, **kwargs) on the database thread pool"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(db_executor, partial(fn, self.session, *args, **kwargs))
+
+    async def commit(self):
+        await self.run(Session.commit)
+
+    async def rollback(self):
+        await self.run(Session.rollback)
+
+    async def close(self):
+        await self.run(Session.close)
+
+
+@asynccontextmanager
+async def async_session() -> AsyncIterator[AsyncDB]:
+    """Open an AsyncDB for work outside a request (e.g. background jobs)"""
+    db = AsyncDB(SessionLocal())
+    try:
+        yield db
+    finally:
+        # Closing rolls back anything left uncommitted
+        await db.close()
+
+
+async def get_db() -> AsyncIterator[AsyncDB]:
+    """FastAPI dependency providing a per-request AsyncDB"""
+    async with async_session() as db:
+        yield db
+
 
 def init_db():
-    """Initialize database and create tables"""
-    Base.metadata.create_all(bind=engine)
+    """Initialize database, applying any pending schema migrations"""
+    run_migrations(engine)
     seed_demo_data()
 
 
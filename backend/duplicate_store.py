@@ -0,0 +1,198 @@
+from typing import Callable, Dict, Any, List, Iterable
+from array import array
+from datetime import datetime
+
+from sqlalchemy import func, or_
+from sqlalchemy.orm import Session
+
+from duplicates import DuplicateDetector
+from lsh import MinHashLSHIndex
+from models import FormData, DuplicatePair
+
+
+MATCH_COLUMNS = (
+    FormData.uuid,
+    FormData.name,
+    FormData.email,
+    FormData.phone,
+    FormData.company,
+    FormData.position
+)
+
+
+class DuplicateStore:
+    """
+    Keeps the duplicate_pairs table current as records are written
+
+    A write matches only the touched record against the LSH index and a few
+    exact-value lookups, then replaces that record's stored pairs, so reading
+    duplicates becomes an indexed query instead of a full-table rescan.
+    """
+
+    FULL_REBUILD_MIN = 1000  # Re-scan everything when this many rows are unindexed
+    MAX_EXACT_MATCHES = 500
+
+    def __init__(self, detector: DuplicateDetector, lsh_index: MinHashLSHIndex):
+        self.detector = detector
+        self.lsh_index = lsh_index
+        self.ready = False
+
+    def sync(self, db: Session) -> int:
+        """
+        Bring the index and stored pairs up to date on startup
+
+        Rows inserted outside the API (seeding, scripts) have no signature yet;
+        a handful are matched incrementally, a large backlog triggers a rebuild.
+
+        Returns:
+            Number of records (re)matched
+        """
+        signed = self.lsh_index.sync(db)
+
+        if len(signed) >= self.FULL_REBUILD_MIN or (
+            signed and db.query(func.count(DuplicatePair.id)).scalar() == 0
+        ):
+            self.rebuild(db)
+        else:
+            for record in self._load(db, signed):
+                self._match(db, record)
+            db.commit()
+
+        self.ready = True
+        return len(signed)
+
+    def rebuild(self, db: Session) -> int:
+        """
+        Recompute every pair from scratch (blocking keys plus LSH candidates)
+
+        Returns:
+            Number of pairs stored
+        """
+        records = [r._asdict() for r in db.query(*MATCH_COLUMNS).all()]
+        pairs, _ = self.detector.find_duplicates(
+            records,
+            threshold=self.detector.borderline_low,
+            extra_pairs=self.lsh_index.candidate_pairs()
+        )
+
+        db.query(DuplicatePair).delete()
+        db.add_all(self._rows(pairs))
+        db.commit()
+        print(f"✓ Duplicate index rebuilt ({len(pairs)} pairs)")
+        return len(pairs)
+
+    def refresh_record(self, db: Session, record: FormData) -> Callable[[], None]:
+        """
+        Re-index one inserted or edited record and replace its stored pairs
+
+        Args:
+            db: Open session (the caller commits)
+            record: The FormData row that changed
+
+        Returns:
+            Callback that moves the record's in-memory LSH buckets; call it
+            only after the transaction commits
+        """
+        uuid = record.uuid
+        # Pick up records another server process re-indexed so they are matched as candidates
+        self.lsh_index.refresh(db)
+        signature = self.lsh_index.update(db, record)
+        self._match(db, self._as_dict(record), signature)
+        return lambda: self.lsh_index.add(uuid, signature)
+
+    def get_pairs(self, db: Session, threshold: float, limit: int = 100, offset: int = 0) -> Dict[str, Any]:
+        """Read stored pairs at or above a confidence threshold, strongest first"""
+        query = db.query(DuplicatePair).filter(DuplicatePair.confidence >= threshold)
+        rows = query.order_by(
+            DuplicatePair.confidence.desc(), DuplicatePair.id
+        ).offset(offset).limit(limit).all()
+        return {
+            "total": query.count(),
+            "duplicates": [self.as_pair(row) for row in rows]
+        }
+
+    def get_unadjudicated(self, db: Session, low: float, high: float, limit: int) -> List[DuplicatePair]:
+        """Borderline pairs the LLM has not reviewed yet"""
+        return db.query(DuplicatePair).filter(
+            DuplicatePair.confidence >= low,
+            DuplicatePair.confidence < high,
+            DuplicatePair.adjudicated == False  # noqa: E712
+        ).order_by(DuplicatePair.confidence.desc()).limit(limit).all()
+
+    def load_records(self, db: Session, uuids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """Fetch the matching columns for a set of UUIDs"""
+        return {r["uuid"]: r for r in self._load(db, uuids)}
+
+    def _match(self, db: Session, record: Dict[str, Any],
+               signature: array = None) -> List[Dict[str, Any]]:
+        """Score one record against its candidates and replace its stored pairs"""
+        uuid = record["uuid"]
+        candidates = self.lsh_index.query(uuid, signature)
+
+        # Exact-value lookups catch matches with dissimilar shingles (e.g. same phone)
+        conditions = [
+            getattr(FormData, column) == record[column]
+            for column in ("email", "phone", "name")
+            if record.get(column)
+        ]
+        if conditions:
+            candidates.update(
+                row.uuid for row in db.query(FormData.uuid).filter(
+                    or_(*conditions), FormData.uuid != uuid
+                ).limit(self.MAX_EXACT_MATCHES)
+            )
+
+        features = self.detector.features(record)
+        pairs = []
+        for other in self._load(db, candidates):
+            other_features = self.detector.features(other)
+            confidence, reasons = self.detector.score(features, other_features)
+            if confidence >= self.detector.borderline_low:
+                pairs.append(self.detector.pair(features, other_features, confidence, reasons))
+
+        db.query(DuplicatePair).filter(
+            or_(DuplicatePair.uuid1 == uuid, DuplicatePair.uuid2 == uuid)
+        ).delete(synchronize_session=False)
+        db.add_all(self._rows(pairs))
+        return pairs
+
+    def _load(self, db: Session, uuids: Iterable[str], chunk_size: int = 500) -> List[Dict[str, Any]]:
+        uuids = list(uuids)
+        records = []
+        for start in range(0, len(uuids), chunk_size):
+            records.extend(
+                r._asdict() for r in db.query(*MATCH_COLUMNS).filter(
+                    FormData.uuid.in_(uuids[start:start + chunk_size])
+                )
+            )
+        return records
+
+    @staticmethod
+    def _rows(pairs: List[Dict[str, Any]]) -> List[DuplicatePair]:
+        now = datetime.utcnow()
+        return [
+            DuplicatePair(
+                uuid1=min(p["uuid1"], p["uuid2"]),
+                uuid2=max(p["uuid1"], p["uuid2"]),
+                confidence=p["confidence"],
+                reason=p["reason"],
+                match_type=p["type"],
+                detected_at=now
+            )
+            for p in pairs
+        ]
+
+    @staticmethod
+    def as_pair(row: DuplicatePair) -> Dict[str, Any]:
+        """API representation of a stored pair"""
+        return {
+            "uuid1": row.uuid1,
+            "uuid2": row.uuid2,
+            "confidence": row.confidence,
+            "reason": row.reason,
+            "type": row.match_type
+        }
+
+    @staticmethod
+    def _as_dict(record: FormData) -> Dict[str, Any]:
+        return {column.key: getattr(record, column.key) for column in MATCH_COLUMNS}
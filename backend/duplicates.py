@@ -0,0 +1,263 @@
+from typing import Dict, Any, List, Set, Tuple, Iterable
+from difflib import SequenceMatcher
+import re
+
+
+HONORIFIC_PATTERN = re.compile(r"^(dr|mr|mrs|ms|prof)\.?\s+", re.IGNORECASE)
+SOUNDEX_CODES = {
+    **dict.fromkeys("bfpv", "1"),
+    **dict.fromkeys("cgjkqsxz", "2"),
+    **dict.fromkeys("dt", "3"),
+    "l": "4",
+    **dict.fromkeys("mn", "5"),
+    "r": "6"
+}
+EMPTY_COMPANIES = {"", "n/a", "na", "none", "-"}
+
+
+def soundex(word: str) -> str:
+    """American Soundex code for a single word (e.g. "Smith" -> "S530")"""
+    word = re.sub(r"[^a-z]", "", word.lower())
+    if not word:
+        return ""
+
+    code = word[0].upper()
+    previous = SOUNDEX_CODES.get(word[0], "")
+    for ch in word[1:]:
+        digit = SOUNDEX_CODES.get(ch, "")
+        if digit and digit != previous:
+            code += digit
+            if len(code) == 4:
+                break
+        # h and w do not separate letters with the same code
+        if ch not in "hw":
+            previous = digit
+    return code.ljust(4, "0")
+
+
+def normalize_name(name: str) -> str:
+    """Lowercase a name and strip honorifics and punctuation"""
+    name = HONORIFIC_PATTERN.sub("", (name or "").strip())
+    return " ".join(re.sub(r"[^a-z\s]", " ", name.lower()).split())
+
+
+def normalize_email(email: str) -> str:
+    """Lowercase an email and drop +tags and dots in the local part of gmail-style addresses"""
+    email = (email or "").strip().lower()
+    if "@" not in email:
+        return email
+    local, domain = email.split("@", 1)
+    local = local.split("+", 1)[0]
+    if domain in ("gmail.com", "googlemail.com"):
+        local = local.replace(".", "")
+    return f"{local}@{domain}"
+
+
+def normalize_phone(phone: str) -> str:
+    """Keep digits only, without a leading North American country code"""
+    digits = re.sub(r"\D", "", phone or "")
+    if len(digits) in (8, 11) and digits.startswith("1"):
+        digits = digits[1:]
+    return digits
+
+
+def trigrams(value: str) -> Set[str]:
+    """Character trigrams of a padded string"""
+    padded = f"  {value} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def jaccard(a: Set[str], b: Set[str]) -> float:
+    if not a or not b:
+        return 0.0
+    overlap = len(a & b)
+    return overlap / (len(a) + len(b) - overlap)
+
+
+class DuplicateDetector:
+    """
+    Local duplicate detection using blocking keys and string similarity
+
+    Records only get compared when they share a blocking key (normalized email,
+    phone, phonetic name code, or company plus surname code), so the number of
+    comparisons grows with block sizes rather than with the square of the table.
+    """
+
+    MAX_BLOCK_SIZE = 200  # Larger blocks fall back to a sorted-neighbourhood window
+    NEIGHBOURHOOD_WINDOW = 10
+
+    def __init__(self, borderline_low: float = 0.75):
+        """
+        Args:
+            borderline_low: Lowest confidence reported at all; pairs between this
+                and the caller's threshold are "borderline" and may be adjudicated
+        """
+        self.borderline_low = borderline_low
+
+    def features(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        """Precompute the normalized values used by blocking and scoring"""
+        name = normalize_name(record.get("name", ""))
+        tokens = name.split()
+        company = " ".join((record.get("company") or "").lower().split())
+        email = normalize_email(record.get("email", ""))
+        return {
+            "uuid": record.get("uuid", ""),
+            "name": name,
+            "name_grams": trigrams(name),
+            "first_code": soundex(tokens[0]) if tokens else "",
+            "last_code": soundex(tokens[-1]) if tokens else "",
+            "email": email,
+            "email_local": email.split("@", 1)[0],
+            "email_grams": trigrams(email.split("@", 1)[0]),
+            "phone": normalize_phone(record.get("phone", "")),
+            "company": "" if company in EMPTY_COMPANIES else company
+        }
+
+    def blocking_keys(self, features: Dict[str, Any]) -> Set[str]:
+        """Keys under which a record is grouped for candidate generation"""
+        keys = set()
+        if "@" in features["email"]:
+            keys.add(f"email:{features['email']}")
+            keys.add(f"email_local:{features['email_local']}")
+        if len(features["phone"]) >= 7:
+            keys.add(f"phone:{features['phone']}")
+        if features["last_code"]:
+            keys.add(f"name:{features['first_code']}:{features['last_code']}")
+            if features["company"]:
+                keys.add(f"company:{features['company']}:{features['last_code']}")
+        return keys
+
+    def candidate_pairs(self, features: List[Dict[str, Any]]) -> Set[Tuple[int, int]]:
+        """Generate index pairs that share at least one blocking key"""
+        blocks: Dict[str, List[int]] = {}
+        for index, feature in enumerate(features):
+            for key in self.blocking_keys(feature):
+                blocks.setdefault(key, []).append(index)
+
+        pairs = set()
+        for members in blocks.values():
+            if len(members) < 2:
+                continue
+            if len(members) <= self.MAX_BLOCK_SIZE:
+                pairs.update(self._all_pairs(members))
+            else:
+                members = sorted(members, key=lambda i: features[i]["name"])
+                for offset, i in enumerate(members):
+                    for j in members[offset + 1:offset + 1 + self.NEIGHBOURHOOD_WINDOW]:
+                        pairs.add((min(i, j), max(i, j)))
+        return pairs
+
+    def score(self, a: Dict[str, Any], b: Dict[str, Any]) -> Tuple[float, List[str]]:
+        """
+        Score how likely two records describe the same person
+
+        Returns:
+            Tuple of (confidence 0.0-1.0, list of matching signals)
+        """
+        reasons = []
+
+        # Cheap trigram overlap first; only run the full matcher when close
+        if a["name"] == b["name"]:
+            name_sim = 1.0
+        else:
+            name_sim = jaccard(a["name_grams"], b["name_grams"])
+        if 0.3 < name_sim < 1.0:
+            name_sim = max(name_sim, SequenceMatcher(None, a["name"], b["name"]).ratio())
+        if name_sim >= 0.99:
+            reasons.append("same name")
+        elif name_sim >= 0.8:
+            reasons.append("similar name")
+        elif a["last_code"] and a["first_code"] == b["first_code"] and a["last_code"] == b["last_code"]:
+            name_sim = max(name_sim, 0.8)
+            reasons.append("names sound alike")
+
+        email_match = bool(a["email"]) and a["email"] == b["email"]
+        if email_match:
+            email_sim = 1.0
+            reasons.append("same email")
+        elif a["email_local"] and a["email_local"] == b["email_local"]:
+            email_sim = 0.8
+            reasons.append("same email username")
+        else:
+            email_sim = jaccard(a["email_grams"], b["email_grams"])
+
+        phone_match = bool(a["phone"]) and a["phone"] == b["phone"]
+        if phone_match:
+            reasons.append("same phone")
+
+        company_match = bool(a["company"]) and a["company"] == b["company"]
+        if company_match:
+            reasons.append("same company")
+
+        confidence = (
+            0.45 * name_sim
+            + 0.30 * email_sim
+            + 0.15 * (1.0 if phone_match else 0.0)
+            + 0.10 * (1.0 if company_match else 0.0)
+        )
+        # A shared email or phone plus a similar name is near-certain
+        if (email_match or phone_match) and name_sim >= 0.8:
+            confidence = max(confidence, 0.97 if email_match and phone_match else 0.9)
+        elif email_match or phone_match:
+            confidence = max(confidence, 0.75)
+
+        return round(min(confidence, 1.0), 3), reasons
+
+    def find_duplicates(self, records: List[Dict[str, Any]], threshold: float = 0.85,
+                        extra_pairs: Iterable[Tuple[str, str]] = ()) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        Find duplicate pairs across all records
+
+        Args:
+            records: Records with uuid, name, email, phone and company
+            threshold: Confidence at or above which a pair is a duplicate
+            extra_pairs: Additional (uuid1, uuid2) candidates, e.g. from the LSH index
+
+        Returns:
+            Tuple of (pairs >= threshold, borderline pairs between borderline_low
+            and threshold), each sorted by confidence descending
+        """
+        features = [self.features(r) for r in records]
+        duplicates, borderline = [], []
+
+        pairs = self.candidate_pairs(features)
+        if extra_pairs:
+            position = {f["uuid"]: index for index, f in enumerate(features)}
+            for uuid1, uuid2 in extra_pairs:
+                i, j = position.get(uuid1), position.get(uuid2)
+                if i is not None and j is not None and i != j:
+                    pairs.add((min(i, j), max(i, j)))
+
+        for i, j in pairs:
+            confidence, reasons = self.score(features[i], features[j])
+            if confidence < self.borderline_low:
+                continue
+            pair = self.pair(features[i], features[j], confidence, reasons)
+            (duplicates if confidence >= threshold else borderline).append(pair)
+
+        duplicates.sort(key=lambda p: p["confidence"], reverse=True)
+        borderline.sort(key=lambda p: p["confidence"], reverse=True)
+        return duplicates, borderline
+
+    @staticmethod
+    def _all_pairs(members: List[int]) -> Iterable[Tuple[int, int]]:
+        for offset, i in enumerate(members):
+            for j in members[offset + 1:]:
+                yield (min(i, j), max(i, j))
+
+    @staticmethod
+    def pair(a: Dict[str, Any], b: Dict[str, Any], confidence: float, reasons: List[str]) -> Dict[str, Any]:
+        """Build the API representation of a scored pair from two feature dicts"""
+        if confidence >= 0.95:
+            match_type = "exact_match"
+        elif confidence >= 0.85:
+            match_type = "likely_duplicate"
+        else:
+            match_type = "possible_duplicate"
+        return {
+            "uuid1": a["uuid"],
+            "uuid2": b["uuid"],
+            "confidence": confidence,
+            "reason": ", ".join(reasons).capitalize() if reasons else "Similar records",
+            "type": match_type
+        }
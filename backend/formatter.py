@@ -0,0 +1,117 @@
+from typing import Dict, Any, List, Tuple
+import re
+
+
+EMAIL_PATTERN = re.compile(r"^[a-z0-9._%+\-]+@[a-z0-9.\-]+\.[a-z]{2,}$")
+STATE_ZIP_PATTERN = re.compile(r",\s*([A-Za-z]{2})\.?\s+(\d{5}(?:-\d{4})?)$")
+HONORIFICS = {"dr": "Dr.", "mr": "Mr.", "mrs": "Mrs.", "ms": "Ms.", "prof": "Prof."}
+
+# Formatter policies
+POLICY_RULES_FIRST = "rules_first"  # Rules for clean records, LLM for ambiguous ones
+POLICY_RULES_ONLY = "rules_only"    # Never call the LLM for formatting
+POLICY_LLM_ALWAYS = "llm_always"    # Original behaviour: every miss goes to the LLM
+POLICIES = (POLICY_RULES_FIRST, POLICY_RULES_ONLY, POLICY_LLM_ALWAYS)
+
+
+def _collapse(value: Any) -> str:
+    """Trim and collapse internal whitespace"""
+    return " ".join(str(value or "").split())
+
+
+def _recase(value: str, allow_upper: bool = True) -> str:
+    """Title-case values typed entirely in lower (or upper) case, leave mixed case alone"""
+    if value.islower() or (allow_upper and value.isupper() and len(value) > 3):
+        return value.title()
+    return value
+
+
+class RuleBasedFormatter:
+    """Deterministic formatter for well-formed records, flagging anything it cannot settle"""
+
+    def format(self, uuid: str, raw_data: Dict[str, Any]) -> Tuple[Dict[str, Any], List[str]]:
+        """
+        Normalize a record without the LLM
+
+        Args:
+            uuid: The UUID identifier
+            raw_data: Raw data from database
+
+        Returns:
+            Tuple of (formatted form fields, list of ambiguity reasons). An empty
+            list means the record is safe to serve without a completion.
+        """
+        ambiguities = []
+
+        name = self._format_name(raw_data.get("name"), ambiguities)
+        email = self._format_email(raw_data.get("email"), ambiguities)
+        phone = self._format_phone(raw_data.get("phone"), ambiguities)
+        address = self._format_address(raw_data.get("address"), ambiguities)
+
+        result = {
+            "uuid": uuid,
+            "name": name,
+            "email": email,
+            "phone": phone,
+            "address": address,
+            "company": _recase(_collapse(raw_data.get("company")), allow_upper=False),
+            "position": _recase(_collapse(raw_data.get("position")), allow_upper=False),
+            "notes": _collapse(raw_data.get("notes"))
+        }
+        return result, ambiguities
+
+    def _format_name(self, value: Any, ambiguities: List[str]) -> str:
+        name = _collapse(value)
+        if not name:
+            ambiguities.append("name: missing")
+            return name
+        if any(ch.isdigit() for ch in name) or "@" in name:
+            ambiguities.append("name: contains digits or symbols")
+            return name
+
+        words = _recase(name).split(" ")
+        honorific = HONORIFICS.get(words[0].rstrip(".").lower())
+        if honorific:
+            words[0] = honorific
+        return " ".join(words)
+
+    def _format_email(self, value: Any, ambiguities: List[str]) -> str:
+        email = _collapse(value).replace(" ", "").lower()
+        if not EMAIL_PATTERN.match(email):
+            ambiguities.append("email: not a valid address")
+        return email
+
+    def _format_phone(self, value: Any, ambiguities: List[str]) -> str:
+        phone = _collapse(value)
+        if not phone:
+            return phone
+        if re.search(r"[a-wyzA-WYZ]", phone) or "x" in phone.lower():
+            ambiguities.append("phone: contains letters or an extension")
+            return phone
+
+        digits = re.sub(r"\D", "", phone)
+        # Strip the North American country code when present
+        if digits.startswith("1") and (phone.startswith("+") or len(digits) in (8, 11)):
+            digits = digits[1:]
+
+        if len(digits) == 7:
+            return f"+1-{digits[:3]}-{digits[3:]}"
+        if len(digits) == 10:
+            return f"+1-{digits[:3]}-{digits[3:6]}-{digits[6:]}"
+
+        ambiguities.append("phone: unrecognized number format")
+        return phone
+
+    def _format_address(self, value: Any, ambiguities: List[str]) -> str:
+        address = _collapse(value)
+        if not address:
+            return address
+
+        address = re.sub(r"\s*,\s*", ", ", address).strip(", ")
+        address = _recase(address)
+        address = STATE_ZIP_PATTERN.sub(
+            lambda m: f", {m.group(1).upper()} {m.group(2)}", address
+        )
+
+        if not any(ch.isdigit() for ch in address):
+            ambiguities.append("address: no street number or postal code")
+        return address
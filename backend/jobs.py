@@ -0,0 +1,209 @@
+from typing import Dict, Any, Awaitable, Callable, List, Optional
+from datetime import datetime, timedelta
+import asyncio
+import json
+import uuid as uuid_lib
+
+from sqlalchemy import update
+
+from models import Job
+
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+
+
+class JobQueue:
+    """
+    In-process background job queue for long-running agent analyses
+
+    Jobs are persisted in the jobs table so their status and results survive
+    restarts; an asyncio worker pool executes them. Queued jobs are picked up
+    on start, and running jobs are re-queued once they have been running for
+    longer than stale_minutes. A worker claims a job with a conditional
+    UPDATE, so with several server processes each job still runs once.
+    """
+
+    def __init__(self, session_factory, workers: int = 2, retention_hours: int = 24,
+                 stale_minutes: int = 30):
+        """
+        Args:
+            session_factory: Callable returning a new database session
+            workers: Number of concurrent worker tasks
+            retention_hours: Finished jobs older than this are purged on start
+            stale_minutes: Running jobs older than this are presumed dead and re-queued on start
+        """
+        self.session_factory = session_factory
+        self.workers = workers
+        self.retention_hours = retention_hours
+        self.stale_minutes = stale_minutes
+
+        self._handlers: Dict[str, Callable[[Dict[str, Any]], Awaitable[Any]]] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+
+    def register(self, kind: str, handler: Callable[[Dict[str, Any]], Awaitable[Any]]):
+        """Register the coroutine that runs jobs of a given kind"""
+        self._handlers[kind] = handler
+
+    async def start(self):
+        """Purge old jobs, re-queue interrupted ones and start the workers"""
+        self._queue = asyncio.Queue()
+        for job_id in await asyncio.to_thread(self._recover):
+            self._queue.put_nowait(job_id)
+
+        self._tasks = [
+            asyncio.create_task(self._worker(), name=f"job-worker-{i}")
+            for i in range(self.workers)
+        ]
+
+    async def stop(self):
+        """Cancel the workers (interrupted jobs are re-queued once stale_minutes have passed)"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def enqueue(self, kind: str, params: Dict[str, Any]) -> str:
+        """
+        Persist a new job and schedule it
+
+        Args:
+            kind: Registered job kind
+            params: JSON-serializable handler arguments
+
+        Returns:
+            The new job id
+        """
+        if kind not in self._handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+
+        job_id = str(uuid_lib.uuid4())
+        await asyncio.to_thread(self._insert, job_id, kind, params)
+        self._queue.put_nowait(job_id)
+        return job_id
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Return a job's status and, once finished, its result or error"""
+        return await asyncio.to_thread(self._load, job_id)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return queue depth and worker count"""
+        return {
+            "queued": self._queue.qsize() if self._queue else 0,
+            "workers": len(self._tasks)
+        }
+
+    async def _worker(self):
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run(job_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # e.g. the database stayed locked; recovery on the next start picks the row up again
+                print(f"Job worker error for {job_id}: {str(e)}")
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job_id: str):
+        job = await asyncio.to_thread(self._mark_running, job_id)
+        if job is None:
+            return
+
+        kind, params = job
+        try:
+            result = await self._handlers[kind](params)
+            await asyncio.to_thread(self._finish, job_id, JOB_SUCCEEDED, result, None)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Job {job_id} ({kind}) failed: {str(e)}")
+            await asyncio.to_thread(self._finish, job_id, JOB_FAILED, None, str(e))
+
+    # --- Synchronous persistence helpers (run in worker threads) ---
+
+    def _insert(self, job_id: str, kind: str, params: Dict[str, Any]):
+        db = self.session_factory()
+        try:
+            db.add(Job(id=job_id, kind=kind, status=JOB_QUEUED, params=json.dumps(params)))
+            db.commit()
+        finally:
+            db.close()
+
+    def _mark_running(self, job_id: str):
+        """Claim a queued job; returns None if another worker or process got it first"""
+        db = self.session_factory()
+        try:
+            claimed = db.execute(
+                update(Job)
+                .where(Job.id == job_id, Job.status == JOB_QUEUED)
+                .values(status=JOB_RUNNING, started_at=datetime.utcnow())
+            ).rowcount
+            db.commit()
+            if claimed != 1:
+                return None
+            job = db.query(Job).filter(Job.id == job_id).first()
+            return job.kind, json.loads(job.params or "{}")
+        finally:
+            db.close()
+
+    def _finish(self, job_id: str, status: str, result: Any, error: Optional[str]):
+        db = self.session_factory()
+        try:
+            job = db.query(Job).filter(Job.id == job_id).first()
+            if job is None:
+                return
+            job.status = status
+            job.result = json.dumps(result, default=str) if result is not None else None
+            job.error = error
+            job.finished_at = datetime.utcnow()
+            db.commit()
+        finally:
+            db.close()
+
+    def _load(self, job_id: str) -> Optional[Dict[str, Any]]:
+        db = self.session_factory()
+        try:
+            job = db.query(Job).filter(Job.id == job_id).first()
+            if job is None:
+                return None
+            return {
+                "job_id": job.id,
+                "kind": job.kind,
+                "status": job.status,
+                "params": json.loads(job.params or "{}"),
+                "result": json.loads(job.result) if job.result else None,
+                "error": job.error,
+                "created_at": job.created_at.isoformat() if job.created_at else None,
+                "started_at": job.started_at.isoformat() if job.started_at else None,
+                "finished_at": job.finished_at.isoformat() if job.finished_at else None
+            }
+        finally:
+            db.close()
+
+    def _recover(self) -> List[str]:
+        db = self.session_factory()
+        try:
+            cutoff = datetime.utcnow() - timedelta(hours=self.retention_hours)
+            db.query(Job).filter(
+                Job.status.in_((JOB_SUCCEEDED, JOB_FAILED)),
+                Job.finished_at < cutoff
+            ).delete(synchronize_session=False)
+
+            # Running jobs may belong to another live process; only long-running ones are presumed dead
+            stale = datetime.utcnow() - timedelta(minutes=self.stale_minutes)
+            db.execute(
+                update(Job)
+                .where(Job.status == JOB_RUNNING, Job.started_at < stale)
+                .values(status=JOB_QUEUED)
+            )
+            db.commit()
+
+            queued = db.query(Job.id).filter(Job.status == JOB_QUEUED).order_by(Job.created_at)
+            return [job_id for (job_id,) in queued]
+        finally:
+            db.close()
@@ -0,0 +1,354 @@
+from openai import AsyncOpenAI
+from typing import Dict, Any, List, Optional
+from collections import deque
+import asyncio
+import math
+import os
+import time
+
+
+# Settings for well-known backends; <NAME>_BASE_URL, <NAME>_API_KEY and <NAME>_MODEL override them
+BACKEND_DEFAULTS = {
+    "openai": {"base_url": None, "api_key": None, "model": "gpt-4o-mini"},
+    "lmstudio": {"base_url": "http://localhost:1234/v1", "api_key": "lm-studio", "model": "gemma-3"},
+}
+
+# Per-backend request timeout in seconds
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "15"))
+
+# Circuit breaker: open after consecutive failures or a high error rate, retry after the cooldown
+LLM_CIRCUIT_FAILURES = int(os.getenv("LLM_CIRCUIT_FAILURES", "3"))
+LLM_CIRCUIT_ERROR_RATE = float(os.getenv("LLM_CIRCUIT_ERROR_RATE", "0.5"))
+LLM_CIRCUIT_COOLDOWN_SECONDS = float(os.getenv("LLM_CIRCUIT_COOLDOWN_SECONDS", "30"))
+
+# Hedging: when the primary is slower than this percentile of its recent latencies, ask the next backend too
+LLM_HEDGE_ENABLED = os.getenv("LLM_HEDGE_ENABLED", "true").lower() == "true"
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "95"))
+LLM_HEDGE_MIN_DELAY_SECONDS = float(os.getenv("LLM_HEDGE_MIN_DELAY_SECONDS", "0.5"))
+LLM_HEDGE_DEFAULT_DELAY_SECONDS = float(os.getenv("LLM_HEDGE_DEFAULT_DELAY_SECONDS", "3"))
+
+
+class NoBackendAvailable(Exception):
+    """Raised when every backend's circuit is open"""
+
+
+def backend_configs_from_env() -> List[Dict[str, Any]]:
+    """
+    Build backend settings from LLM_BACKENDS, a comma-separated list in priority order
+
+    Defaults to LLM_PROVIDER so single-provider configurations keep working.
+    Any name other than openai and lmstudio needs <NAME>_BASE_URL and <NAME>_MODEL.
+    """
+    names = os.getenv("LLM_BACKENDS", os.getenv("LLM_PROVIDER", "openai"))
+    configs = []
+    for name in (part.strip().lower() for part in names.split(",")):
+        if not name:
+            continue
+        prefix = name.upper()
+        defaults = BACKEND_DEFAULTS.get(name, {"base_url": None, "api_key": "none", "model": None})
+        config = {
+            "name": name,
+            "base_url": os.getenv(f"{prefix}_BASE_URL", defaults["base_url"]),
+            "api_key": os.getenv(f"{prefix}_API_KEY", defaults["api_key"]),
+            "model": os.getenv(f"{prefix}_MODEL", defaults["model"])
+        }
+        if name not in BACKEND_DEFAULTS and not (config["base_url"] and config["model"]):
+            raise ValueError(f"LLM backend '{name}' needs {prefix}_BASE_URL and {prefix}_MODEL")
+        configs.append(config)
+    return configs
+
+
+class CircuitBreaker:
+    """
+    Per-backend circuit: closed -> open on failure -> half-open trial after the cooldown
+
+    While open the backend is skipped instead of waiting out its timeout. A
+    single trial request is let through once the cooldown has passed; its
+    outcome closes or re-opens the circuit.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 3, error_rate: float = 0.5,
+                 cooldown: float = 30.0, window: int = 20):
+        """
+        Args:
+            failure_threshold: Consecutive failures that open the circuit
+            error_rate: Failure share over the window that opens the circuit
+            cooldown: Seconds before an open circuit allows a trial request
+            window: Recent outcomes considered for the error rate
+        """
+        self.failure_threshold = failure_threshold
+        self.error_rate = error_rate
+        self.cooldown = cooldown
+        self.state = self.CLOSED
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self._consecutive_failures = 0
+        self._outcomes = deque(maxlen=window)  # True for success
+        self._trial_in_flight = False
+
+    def available(self) -> bool:
+        """Whether a request may be sent now"""
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN:
+            return time.monotonic() - self.opened_at >= self.cooldown
+        return not self._trial_in_flight
+
+    def claim(self) -> bool:
+        """
+        Reserve a request if one may be sent now
+
+        Past the cooldown the request becomes the half-open trial, and the
+        backend stays unavailable to other requests until its outcome is known.
+        """
+        if not self.available():
+            return False
+        if self.state != self.CLOSED:
+            self.state = self.HALF_OPEN
+            self._trial_in_flight = True
+        return True
+
+    def on_success(self):
+        self._outcomes.append(True)
+        self._consecutive_failures = 0
+        self._trial_in_flight = False
+        self.state = self.CLOSED
+
+    def on_failure(self):
+        self._outcomes.append(False)
+        self._consecutive_failures += 1
+        self._trial_in_flight = False
+        failures = self._outcomes.count(False)
+        if (self.state == self.HALF_OPEN
+                or self._consecutive_failures >= self.failure_threshold
+                or (len(self._outcomes) >= self._outcomes.maxlen // 2
+                    and failures / len(self._outcomes) >= self.error_rate)):
+            if self.state != self.OPEN:
+                self.times_opened += 1
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+            self._outcomes.clear()
+
+    def on_abandoned(self):
+        """A request was cancelled (e.g. a losing hedge) without telling us anything"""
+        self._trial_in_flight = False
+
+
+class LLMBackend:
+    """One OpenAI-compatible endpoint with its latency history and circuit breaker"""
+
+    def __init__(self, name: str, model: str, client: AsyncOpenAI, window: int = 100):
+        self.name = name
+        self.model = model
+        self.client = client
+        self.breaker = CircuitBreaker(
+            failure_threshold=LLM_CIRCUIT_FAILURES,
+            error_rate=LLM_CIRCUIT_ERROR_RATE,
+            cooldown=LLM_CIRCUIT_COOLDOWN_SECONDS
+        )
+        self.latencies = deque(maxlen=window)  # Seconds, successful requests only
+        self.requests = 0
+        self.failures = 0
+        self.hedges_won = 0
+
+    def latency_percentile(self, percentile: float) -> Optional[float]:
+        """Nearest-rank percentile of recent latencies, or None with too few samples"""
+        if len(self.latencies) < 5:
+            return None
+        ordered = sorted(self.latencies)
+        rank = max(0, math.ceil(percentile / 100 * len(ordered)) - 1)
+        return ordered[rank]
+
+    def stats(self) -> Dict[str, Any]:
+        p50 = self.latency_percentile(50)
+        p95 = self.latency_percentile(95)
+        return {
+            "name": self.name,
+            "model": self.model,
+            "circuit": self.breaker.state,
+            "times_opened": self.breaker.times_opened,
+            "requests": self.requests,
+            "failures": self.failures,
+            "error_rate": round(self.failures / self.requests, 3) if self.requests else 0.0,
+            "hedges_won": self.hedges_won,
+            "p50_ms": round(p50 * 1000, 1) if p50 is not None else None,
+            "p95_ms": round(p95 * 1000, 1) if p95 is not None else None
+        }
+
+
+class LLMRouter:
+    """
+    Routes chat completions across OpenAI-compatible backends in priority order
+
+    Backends with an open circuit are skipped, failures fall over to the next
+    backend, and when the primary has not answered within its recent latency
+    percentile the request is hedged to the next backend and whichever
+    answers first wins.
+    """
+
+    def __init__(self, configs: List[Dict[str, Any]], http_client=None,
+                 hedge_enabled: bool = LLM_HEDGE_ENABLED,
+                 hedge_percentile: float = LLM_HEDGE_PERCENTILE):
+        """
+        Args:
+            configs: Dicts with name, base_url, api_key and model, in priority order
+            http_client: Pooled httpx client shared by every backend
+            hedge_enabled: Send a second request when the first is slow
+            hedge_percentile: Latency percentile of the primary that triggers the hedge
+        """
+        if not configs:
+            raise ValueError("At least one LLM backend is required")
+        self.backends = [
+            LLMBackend(
+                config["name"],
+                config["model"],
+                AsyncOpenAI(
+                    base_url=config.get("base_url"),
+                    api_key=config.get("api_key"),
+                    timeout=LLM_TIMEOUT_SECONDS,
+                    # The router fails over instead; SDK retries would triple the wait on a dead backend
+                    max_retries=0,
+                    http_client=http_client
+                )
+            )
+            for config in configs
+        ]
+        self.hedge_enabled = hedge_enabled
+        self.hedge_percentile = hedge_percentile
+        self.hedges_sent = 0
+        self.failovers = 0
+        self.rejected = 0  # Requests refused because every circuit was open
+
+    @property
+    def model(self) -> str:
+        """Model of the primary backend"""
+        return self.backends[0].model
+
+    async def chat_completion(self, **kwargs):
+        """
+        chat.completions.create on the best available backend (model is filled in per backend)
+
+        Raises:
+            NoBackendAvailable: Every circuit is open
+            Exception: The last backend's error when all of them failed
+        """
+        candidates = self._candidates()
+        pending: Dict[asyncio.Task, LLMBackend] = {}
+        next_index = 0
+        hedged = False
+        last_error: Optional[Exception] = None
+
+        def launch() -> bool:
+            """Start the next candidate whose circuit still admits a request"""
+            nonlocal next_index
+            while next_index < len(candidates):
+                backend = candidates[next_index]
+                next_index += 1
+                # Claimed before the task starts, so concurrent requests cannot share a half-open trial
+                if backend.breaker.claim():
+                    pending[asyncio.create_task(self._call(backend, kwargs))] = backend
+                    return True
+            return False
+
+        if not launch():
+            self.rejected += 1
+            raise NoBackendAvailable("All LLM backends are unavailable (circuits open)")
+        try:
+            while pending:
+                delay = None
+                if self.hedge_enabled and not hedged and next_index < len(candidates):
+                    delay = self._hedge_delay(candidates[0])
+                done, _ = await asyncio.wait(pending, timeout=delay, return_when=asyncio.FIRST_COMPLETED)
+
+                if not done:
+                    # Primary is slower than usual; race the next backend against it
+                    hedged = True
+                    self.hedges_sent += 1
+                    launch()
+                    continue
+
+                for task in done:
+                    backend = pending.pop(task)
+                    if task.exception() is None:
+                        if hedged and backend is not candidates[0]:
+                            backend.hedges_won += 1
+                        return task.result()
+                    last_error = task.exception()
+
+                if not pending and next_index < len(candidates):
+                    self.failovers += 1
+                    launch()
+        finally:
+            for task, backend in pending.items():
+                task.cancel()
+                # A task cancelled before it started never reaches _call's cleanup
+                backend.breaker.on_abandoned()
+        raise last_error
+
+    async def chat_completion_stream(self, **kwargs):
+        """
+        Open a streaming completion, falling over to the next backend if it cannot be started
+
+        Streams are not hedged; once chunks flow the caller owns the stream.
+        """
+        last_error: Optional[Exception] = None
+        for index, backend in enumerate(self._candidates()):
+            if not backend.breaker.claim():
+                continue
+            if index:
+                self.failovers += 1
+            try:
+                return await self._call(backend, {**kwargs, "stream": True}, track_latency=False)
+            except Exception as e:
+                last_error = e
+        raise last_error or NoBackendAvailable("All LLM backends are unavailable (circuits open)")
+
+    async def aclose(self):
+        for backend in self.backends:
+            await backend.client.close()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "hedge_enabled": self.hedge_enabled,
+            "hedge_percentile": self.hedge_percentile,
+            "hedges_sent": self.hedges_sent,
+            "failovers": self.failovers,
+            "rejected": self.rejected,
+            "backends": [backend.stats() for backend in self.backends]
+        }
+
+    def _candidates(self) -> List[LLMBackend]:
+        candidates = [backend for backend in self.backends if backend.breaker.available()]
+        if not candidates:
+            self.rejected += 1
+            raise NoBackendAvailable("All LLM backends are unavailable (circuits open)")
+        return candidates
+
+    def _hedge_delay(self, backend: LLMBackend) -> float:
+        observed = backend.latency_percentile(self.hedge_percentile)
+        if observed is None:
+            return LLM_HEDGE_DEFAULT_DELAY_SECONDS
+        return max(observed, LLM_HEDGE_MIN_DELAY_SECONDS)
+
+    async def _call(self, backend: LLMBackend, kwargs: Dict[str, Any], track_latency: bool = True):
+        backend.requests += 1
+        started = time.perf_counter()
+        try:
+            response = await backend.client.chat.completions.create(**{**kwargs, "model": backend.model})
+        except asyncio.CancelledError:
+            backend.requests -= 1
+            backend.breaker.on_abandoned()
+            raise
+        except Exception:
+            backend.failures += 1
+            backend.breaker.on_failure()
+            raise
+        # A stream returns once headers arrive, which says nothing about completion latency
+        if track_latency:
+            backend.latencies.append(time.perf_counter() - started)
+        backend.breaker.on_success()
+        return response
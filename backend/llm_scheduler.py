@@ -0,0 +1,187 @@
+from typing import Dict, Any, List, Optional
+from collections import deque
+from contextlib import asynccontextmanager
+import asyncio
+import heapq
+import itertools
+import math
+import os
+import time
+
+
+# Lower runs first: user-facing lookups, then bulk requests, then analyses and pre-warming
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BATCH = 1
+PRIORITY_BACKGROUND = 2
+PRIORITY_NAMES = {PRIORITY_INTERACTIVE: "interactive", PRIORITY_BATCH: "batch", PRIORITY_BACKGROUND: "background"}
+
+# Completions running at once, and provider rate limits (0 disables a limit)
+LLM_MAX_IN_FLIGHT = int(os.getenv("LLM_MAX_IN_FLIGHT", "10"))
+LLM_REQUESTS_PER_MINUTE = float(os.getenv("LLM_REQUESTS_PER_MINUTE", "0"))
+LLM_TOKENS_PER_MINUTE = float(os.getenv("LLM_TOKENS_PER_MINUTE", "0"))
+
+
+def estimate_tokens(*texts: str, max_tokens: int = 0) -> int:
+    """Rough token count for rate limiting: about four characters per prompt token plus the completion limit"""
+    return sum(len(text) for text in texts) // 4 + max_tokens
+
+
+class TokenBucket:
+    """Refills continuously up to one minute's allowance; may go negative to carry a debt"""
+
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.rate = per_minute / 60.0
+        self.level = per_minute
+        self._updated = time.monotonic()
+
+    def refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until amount is available (an oversized request waits for a full bucket)"""
+        self.refill()
+        needed = min(amount, self.capacity) - self.level
+        return max(0.0, needed / self.rate)
+
+
+class LLMScheduler:
+    """
+    Admission control for LLM completions
+
+    Callers wait in per-priority queues; a request is admitted when fewer
+    than max_in_flight completions are running and the requests- and
+    tokens-per-minute buckets can pay for it. Priorities are strict: a
+    waiting interactive lookup is always admitted before batch or background
+    work, so analyses cannot starve form lookups or trip provider limits.
+    """
+
+    def __init__(self, max_in_flight: int = LLM_MAX_IN_FLIGHT,
+                 requests_per_minute: float = LLM_REQUESTS_PER_MINUTE,
+                 tokens_per_minute: float = LLM_TOKENS_PER_MINUTE):
+        """
+        Args:
+            max_in_flight: Completions allowed to run at once
+            requests_per_minute: Request budget (0 for unlimited)
+            tokens_per_minute: Token budget, prompt plus completion (0 for unlimited)
+        """
+        self.max_in_flight = max_in_flight
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute > 0 else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute > 0 else None
+
+        self.in_flight = 0
+        self._waiters: List[tuple] = []  # heap of (priority, seq, future, tokens)
+        self._sequence = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+        self.admitted = {priority: 0 for priority in PRIORITY_NAMES}
+        self.waits = {priority: deque(maxlen=500) for priority in PRIORITY_NAMES}  # Seconds queued
+        self.rate_limited = 0  # Times the head of the queue waited for a bucket to refill
+
+    @asynccontextmanager
+    async def slot(self, priority: int = PRIORITY_BACKGROUND, tokens: int = 0):
+        """
+        Hold a completion slot for the duration of the block
+
+        Yields a callback taking the actual token usage, so the token bucket
+        can be corrected once the response reports it.
+        """
+        await self._acquire(priority, tokens)
+        charged = tokens
+
+        def record_usage(actual: int):
+            nonlocal charged
+            if self.tokens is not None and actual:
+                self.tokens.refill()
+                self.tokens.level += charged - actual
+                charged = actual
+
+        try:
+            yield record_usage
+        finally:
+            self.in_flight -= 1
+            self._dispatch()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return queue depth, wait times and limiter state"""
+        depth = {name: 0 for name in PRIORITY_NAMES.values()}
+        for priority, _, future, _ in self._waiters:
+            if not future.done():
+                depth[PRIORITY_NAMES[priority]] += 1
+
+        def wait_stats(samples: deque) -> Dict[str, Any]:
+            if not samples:
+                return {"avg_ms": None, "p95_ms": None}
+            ordered = sorted(samples)
+            return {
+                "avg_ms": round(sum(ordered) / len(ordered) * 1000, 1),
+                "p95_ms": round(ordered[max(0, math.ceil(0.95 * len(ordered)) - 1)] * 1000, 1)
+            }
+
+        if self.requests:
+            self.requests.refill()
+        if self.tokens:
+            self.tokens.refill()
+        return {
+            "max_in_flight": self.max_in_flight,
+            "in_flight": self.in_flight,
+            "queued": depth,
+            "admitted": {PRIORITY_NAMES[p]: count for p, count in self.admitted.items()},
+            "wait": {PRIORITY_NAMES[p]: wait_stats(samples) for p, samples in self.waits.items()},
+            "rate_limited": self.rate_limited,
+            "requests_available": round(self.requests.level, 1) if self.requests else None,
+            "tokens_available": round(self.tokens.level) if self.tokens else None
+        }
+
+    async def _acquire(self, priority: int, tokens: int):
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._sequence), future, tokens))
+        queued_at = time.monotonic()
+        self._dispatch()
+        try:
+            await future
+        except asyncio.CancelledError:
+            # Admitted just as the caller gave up: hand the slot back
+            if future.done() and not future.cancelled():
+                self.in_flight -= 1
+                self._dispatch()
+            raise
+        self.waits[priority].append(time.monotonic() - queued_at)
+
+    def _dispatch(self):
+        """Admit waiters in priority order while slots and budget allow"""
+        while self._waiters and self.in_flight < self.max_in_flight:
+            priority, _, future, tokens = self._waiters[0]
+            if future.done():
+                heapq.heappop(self._waiters)  # Cancelled while queued
+                continue
+
+            delay = max(
+                self.requests.wait_time(1) if self.requests else 0.0,
+                self.tokens.wait_time(tokens) if self.tokens else 0.0
+            )
+            if delay > 0:
+                # Lower priorities stay behind the head rather than spending its budget
+                self.rate_limited += 1
+                self._schedule(delay)
+                return
+
+            heapq.heappop(self._waiters)
+            if self.requests:
+                self.requests.level -= 1
+            if self.tokens:
+                self.tokens.level -= tokens
+            self.in_flight += 1
+            self.admitted[priority] += 1
+            future.set_result(None)
+
+    def _schedule(self, delay: float):
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = asyncio.get_running_loop().call_later(delay, self._on_timer)
+
+    def _on_timer(self):
+        self._timer = None
+        self._dispatch()
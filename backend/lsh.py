@@ -0,0 +1,255 @@
+from typing import Dict, Any, List, Optional, Set, Tuple
+from array import array
+from datetime import datetime, timedelta
+import hashlib
+import random
+import threading
+
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+
+from duplicates import normalize_name, normalize_email
+from models import FormData, RecordSignature
+
+
+# Signatures committed slightly out of updated_at order are still caught by the next refresh
+REFRESH_OVERLAP = timedelta(seconds=5)
+
+
+def shingles(text: str, k: int = 3) -> Set[str]:
+    """Character k-shingles of a whitespace-collapsed, lowercased string"""
+    text = " ".join((text or "").lower().split())
+    if not text:
+        return set()
+    if len(text) <= k:
+        return {text}
+    return {text[i:i + k] for i in range(len(text) - k + 1)}
+
+
+def _hash64(value: str) -> int:
+    """Stable 64-bit hash (Python's hash() is salted per process)"""
+    return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), "little")
+
+
+class MinHashLSHIndex:
+    """
+    MinHash-LSH index over character shingles of name, email and address
+
+    Each field gets its own MinHash signature, split into bands; records whose
+    band values collide in any field become duplicate candidates. Signatures
+    are persisted in the record_signatures table so restarts only rebuild the
+    in-memory buckets, and edits re-index just the touched record. Signatures
+    written by other server processes are loaded by refresh().
+    """
+
+    FIELDS = ("name", "email", "address")
+
+    def __init__(self, num_perm: int = 32, bands: int = 8, max_bucket_size: int = 50, seed: int = 1):
+        """
+        Args:
+            num_perm: MinHash values per field (must be divisible by bands)
+            bands: LSH bands per field; fewer rows per band means looser matching
+            max_bucket_size: Buckets larger than this (e.g. a shared hospital
+                address) are too unselective and are skipped for candidates
+            seed: Seed for the hash masks; changing it invalidates stored signatures
+        """
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.max_bucket_size = max_bucket_size
+        self.version = f"p{num_perm}-b{bands}-s{seed}"
+
+        rng = random.Random(seed)
+        self._masks = [rng.getrandbits(64) for _ in range(num_perm)]
+
+        self._signatures: Dict[str, array] = {}
+        self._buckets: Dict[Tuple[int, int, int], Set[str]] = {}
+        self._lock = threading.Lock()
+        self.last_seen: Optional[datetime] = None
+        self.ready = False
+
+    def signature(self, record: Dict[str, Any]) -> array:
+        """Compute the concatenated per-field MinHash signature of a record"""
+        values = {
+            "name": normalize_name(record.get("name", "")),
+            "email": normalize_email(record.get("email", "")).split("@", 1)[0],
+            "address": record.get("address", "")
+        }
+
+        signature = array("Q")
+        for field in self.FIELDS:
+            hashes = [_hash64(s) for s in shingles(values[field])]
+            if hashes:
+                signature.extend(min([h ^ mask for h in hashes]) for mask in self._masks)
+            else:
+                signature.extend([0] * self.num_perm)  # Empty field never collides
+        return signature
+
+    def add(self, uuid: str, signature: array):
+        """Insert or replace a record's signature in the in-memory buckets"""
+        with self._lock:
+            self._remove(uuid)
+            self._signatures[uuid] = signature
+            for key in self._band_keys(signature):
+                self._buckets.setdefault(key, set()).add(uuid)
+
+    def remove(self, uuid: str):
+        """Drop a record from the in-memory buckets"""
+        with self._lock:
+            self._remove(uuid)
+
+    def query(self, uuid: str, signature: array = None) -> Set[str]:
+        """
+        Return UUIDs sharing at least one band bucket with the given record
+
+        Args:
+            uuid: Record to find candidates for
+            signature: Signature to look up instead of the indexed one (e.g. one not committed yet)
+        """
+        with self._lock:
+            if signature is None:
+                signature = self._signatures.get(uuid)
+            if signature is None:
+                return set()
+
+            candidates = set()
+            for key in self._band_keys(signature):
+                bucket = self._buckets.get(key, ())
+                if len(bucket) <= self.max_bucket_size:
+                    candidates.update(bucket)
+            candidates.discard(uuid)
+            return candidates
+
+    def candidate_pairs(self) -> Set[Tuple[str, str]]:
+        """Return every candidate pair across the whole index"""
+        pairs = set()
+        with self._lock:
+            for bucket in self._buckets.values():
+                if len(bucket) < 2 or len(bucket) > self.max_bucket_size:
+                    continue
+                members = sorted(bucket)
+                for offset, first in enumerate(members):
+                    for second in members[offset + 1:]:
+                        pairs.add((first, second))
+        return pairs
+
+    def update(self, db: Session, record: FormData) -> array:
+        """
+        Stage one record's new signature in the caller's transaction
+
+        The in-memory buckets are left alone so a rolled-back write cannot
+        leave them ahead of the database; add() the returned signature once
+        the transaction has committed.
+
+        Args:
+            db: Open session (the caller commits)
+            record: The inserted or edited FormData row
+
+        Returns:
+            The record's new signature
+        """
+        signature = self.signature(self._record_data(record))
+        db.merge(RecordSignature(
+            uuid=record.uuid,
+            signature=signature.tobytes(),
+            version=self.version,
+            updated_at=datetime.utcnow()
+        ))
+        return signature
+
+    def sync(self, db: Session, chunk_size: int = 1000) -> List[str]:
+        """
+        Load persisted signatures, then index rows that are new or stale
+
+        Args:
+            db: Open session
+            chunk_size: Rows signed per commit
+
+        Returns:
+            UUIDs of the records that had to be (re)signed
+        """
+        started = datetime.utcnow()
+        for uuid, blob in db.query(RecordSignature.uuid, RecordSignature.signature).filter(
+            RecordSignature.version == self.version
+        ).yield_per(chunk_size):
+            signature = array("Q")
+            signature.frombytes(blob)
+            self.add(uuid, signature)
+
+        signed = []
+        while True:
+            missing = db.query(FormData).outerjoin(
+                RecordSignature, RecordSignature.uuid == FormData.uuid
+            ).filter(
+                or_(RecordSignature.uuid.is_(None), RecordSignature.version != self.version)
+            ).limit(chunk_size).all()
+            if not missing:
+                break
+
+            signatures = {record.uuid: self.update(db, record) for record in missing}
+            db.commit()
+            for uuid, signature in signatures.items():
+                self.add(uuid, signature)
+            signed.extend(signatures)
+
+        self.last_seen = started
+        self.ready = True
+        return signed
+
+    def refresh(self, db: Session) -> int:
+        """Load signatures persisted since the last sync or refresh; returns the number loaded"""
+        if self.last_seen is None:
+            return 0
+        started = datetime.utcnow()
+        rows = db.query(RecordSignature.uuid, RecordSignature.signature).filter(
+            RecordSignature.updated_at >= self.last_seen - REFRESH_OVERLAP,
+            RecordSignature.version == self.version
+        ).all()
+        for uuid, blob in rows:
+            signature = array("Q")
+            signature.frombytes(blob)
+            self.add(uuid, signature)
+        self.last_seen = started
+        return len(rows)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return index size information"""
+        with self._lock:
+            return {
+                "ready": self.ready,
+                "records": len(self._signatures),
+                "buckets": len(self._buckets),
+                "oversized_buckets": sum(
+                    1 for b in self._buckets.values() if len(b) > self.max_bucket_size
+                ),
+                "version": self.version
+            }
+
+    def _band_keys(self, signature: array) -> List[Tuple[int, int, int]]:
+        keys = []
+        for index in range(len(self.FIELDS)):
+            start = index * self.num_perm
+            for band in range(self.bands):
+                values = tuple(signature[start + band * self.rows:start + (band + 1) * self.rows])
+                if any(values):
+                    keys.append((index, band, hash(values)))
+        return keys
+
+    def _remove(self, uuid: str):
+        """Remove a record's bucket memberships (caller holds the lock)"""
+        signature = self._signatures.pop(uuid, None)
+        if signature is None:
+            return
+        for key in self._band_keys(signature):
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                bucket.discard(uuid)
+                if not bucket:
+                    del self._buckets[key]
+
+    @staticmethod
+    def _record_data(record: FormData) -> Dict[str, Any]:
+        return {"name": record.name, "email": record.email, "address": record.address}
@@ -1,19 +1,94 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Depends
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import Optional, List, Dict, Any
+from contextlib import asynccontextmanager
+import asyncio
+import json
+import time
 import uvicorn
-from database import SessionLocal, init_db
+from dotenv import load_dotenv
+
+# Load environment variables from .env file (before modules that read them on import)
+load_dotenv()
+
+from sqlalchemy.orm import Session
+from database import SessionLocal, AsyncDB, async_session, get_db, init_db
 from models import FormData, FormInteraction
-from agent import UUIDAgent
+from agent import UUIDAgent, AGENT_SWR_MODE, DUPLICATE_LLM_ADJUDICATION, DUPLICATE_ADJUDICATION_LIMIT
+from llm_router import backend_configs_from_env
+from lsh import MinHashLSHIndex
+from duplicate_store import DuplicateStore
+from jobs import JobQueue
+from stale import StaleMaterializer
+from buffers import AccessStatsBuffer, InteractionBuffer
+from search import SearchIndex, SEARCH_FIELDS
+from prewarm import CachePrewarmer
 import os
-from dotenv import load_dotenv
 from datetime import datetime
+from sqlalchemy import func, case, or_
+from cache import LRUCache
+
+
+def build_duplicate_index():
+    """Load persisted duplicate signatures and match any rows added since"""
+    db = SessionLocal()
+    try:
+        matched = duplicate_store.sync(db)
+        print(f"✓ Duplicate index ready ({matched} records matched)")
+    finally:
+        db.close()
+
+
+def refresh_search_index():
+    """Re-index records edited by other server processes since the last refresh"""
+    db = SessionLocal()
+    try:
+        search_index.refresh(db)
+    finally:
+        db.close()
+
+
+def build_search_index():
+    """Load every record into the in-memory typeahead index"""
+    db = SessionLocal()
+    try:
+        indexed = search_index.build(db)
+        print(f"✓ Search index ready ({indexed} records)")
+    finally:
+        db.close()
 
-# Load environment variables from .env file
-load_dotenv()
 
-app = FastAPI(title="UUID Form Filler Agent API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Warm caches and indexes on startup and release LLM connections on shutdown"""
+    await asyncio.to_thread(agent.warm_cache)
+    # Build in the background; /api/duplicates serves stored pairs meanwhile
+    index_task = asyncio.create_task(asyncio.to_thread(build_duplicate_index))
+    search_task = asyncio.create_task(asyncio.to_thread(build_search_index))
+    await job_queue.start()
+    await access_buffer.start()
+    await interaction_buffer.start()
+    stale_task = asyncio.create_task(
+        stale_materializer.run_periodically(STALE_REFRESH_MINUTES * 60)
+    )
+    if PREWARM_ENABLED:
+        await prewarmer.start(PREWARM_INTERVAL_MINUTES * 60)
+    yield
+    stale_task.cancel()
+    await asyncio.gather(stale_task, return_exceptions=True)
+    await prewarmer.stop()
+    # Flush buffered access counts and interactions before the process exits
+    await access_buffer.stop()
+    await interaction_buffer.stop()
+    await job_queue.stop()
+    await index_task
+    await search_task
+    await agent.aclose()
+
+
+app = FastAPI(title="UUID Form Filler Agent API", lifespan=lifespan)
 
 # CORS middleware
 app.add_middleware(
@@ -27,27 +102,68 @@ app.add_middleware(
 # Initialize database
 init_db()
 
-# Get LLM provider from environment (default to openai)
-LLM_PROVIDER = os.getenv("LLM_PROVIDER", "openai").lower()
+# LLM backends in priority order (LLM_BACKENDS, falling back to LLM_PROVIDER)
+LLM_BACKEND_CONFIGS = backend_configs_from_env()
+print("Using LLM backends: " + ", ".join(
+    f"{config['name']} ({config['model']})" for config in LLM_BACKEND_CONFIGS
+))
+agent = UUIDAgent(backends=LLM_BACKEND_CONFIGS)
+
+
+# Fuzzy duplicate candidate index and the stored pairs it maintains on write
+lsh_index = MinHashLSHIndex()
+duplicate_store = DuplicateStore(agent.duplicate_detector, lsh_index)
+
+# Typeahead search over uuid, name, email and company
+search_index = SearchIndex()
+MAX_SEARCH_RESULTS = int(os.getenv("MAX_SEARCH_RESULTS", "50"))
+
+# Materialized staleness scores, refreshed on a schedule
+STALE_REFRESH_MINUTES = float(os.getenv("STALE_REFRESH_MINUTES", "60"))
+stale_materializer = StaleMaterializer(
+    SessionLocal,
+    agent,
+    min_days=int(os.getenv("STALE_MIN_DAYS", "90")),
+    annotate_top=int(os.getenv("STALE_ANNOTATE_TOP", "30"))
+)
 
-# Initialize agent based on provider
-if LLM_PROVIDER == "lmstudio":
-    print("Using LM Studio with locally hosted model")
-    agent = UUIDAgent(
-        provider="lmstudio",
-        model=os.getenv("LMSTUDIO_MODEL", "gemma-3")
-    )
-else:
-    print("Using OpenAI API")
-    agent = UUIDAgent(
-        api_key=os.getenv("OPENAI_API_KEY"),
-        provider="openai",
-        model=os.getenv("OPENAI_MODEL", "gpt-4o-mini")
-    )
+# Formats the most accessed records, and relatives of opened ones, ahead of demand
+PREWARM_ENABLED = os.getenv("PREWARM_ENABLED", "true").lower() == "true"
+PREWARM_INTERVAL_MINUTES = float(os.getenv("PREWARM_INTERVAL_MINUTES", "30"))
+prewarmer = CachePrewarmer(
+    SessionLocal,
+    agent,
+    top_n=int(os.getenv("PREWARM_TOP_N", "100")),
+    rate_per_minute=float(os.getenv("PREWARM_RATE_PER_MINUTE", "30")),
+    related_limit=int(os.getenv("PREWARM_RELATED_LIMIT", "5"))
+)
+
+# Access counts are buffered in memory and written in periodic batches
+access_buffer = AccessStatsBuffer(
+    SessionLocal,
+    flush_interval=float(os.getenv("ACCESS_FLUSH_SECONDS", "5")),
+    max_pending=int(os.getenv("ACCESS_FLUSH_MAX_PENDING", "5000"))
+)
+
+# Interaction telemetry is appended in memory and inserted in batches
+interaction_buffer = InteractionBuffer(
+    SessionLocal,
+    flush_interval=float(os.getenv("INTERACTION_FLUSH_SECONDS", "2")),
+    max_pending=int(os.getenv("INTERACTION_FLUSH_MAX_PENDING", "2000"))
+)
+
+# Background jobs for analyses that may take the full LLM timeout
+job_queue = JobQueue(
+    SessionLocal,
+    workers=int(os.getenv("JOB_WORKERS", "2")),
+    retention_hours=int(os.getenv("JOB_RETENTION_HOURS", "24")),
+    stale_minutes=int(os.getenv("JOB_STALE_MINUTES", "30"))
+)
 
 
 class UUIDRequest(BaseModel):
     uuid: str
+    swr: Optional[bool] = None  # Overrides AGENT_SWR_MODE for this request
 
 
 class FormResponse(BaseModel):
@@ -59,6 +175,52 @@ class FormResponse(BaseModel):
     company: str
     position: str
     notes: str
+    provisional: bool = False  # True while an LLM refinement is still pending
+
+
+class UUIDPage(BaseModel):
+    uuids: List[str]
+    next_cursor: Optional[str] = None
+
+
+class BatchUUIDRequest(BaseModel):
+    uuids: List[str]
+
+
+class BatchFormResponse(BaseModel):
+    results: List[FormResponse]
+    missing: List[str]
+
+
+# Short-lived cache for /api/database-stats, dropped on writes
+DATABASE_STATS_KEY = "database-stats"
+stats_cache = LRUCache(
+    max_entries=8,
+    default_ttl=float(os.getenv("DATABASE_STATS_TTL_SECONDS", "30"))
+)
+
+class InteractionRecord(BaseModel):
+    uuid: str
+    field_name: str
+    interaction_type: str
+    original_value: Optional[str] = None
+    corrected_value: Optional[str] = None
+    timestamp: Optional[datetime] = None
+
+
+class BatchInteractionRequest(BaseModel):
+    interactions: List[InteractionRecord]
+
+
+# Page size bounds for /api/uuids
+MAX_UUID_PAGE = int(os.getenv("MAX_UUID_PAGE", "1000"))
+UUID_STREAM_CHUNK = 1000
+
+# Upper bound on interactions accepted by a single bulk request
+MAX_BATCH_INTERACTIONS = int(os.getenv("MAX_BATCH_INTERACTIONS", "1000"))
+
+# Upper bound on UUIDs accepted by a single batch request
+MAX_BATCH_UUIDS = int(os.getenv("MAX_BATCH_UUIDS", "100"))
 
 
 @app.get("/")
@@ -66,189 +228,364 @@ async def root():
     return {"message": "UUID Form Filler Agent API", "status": "running"}
 
 
-@app.get("/api/uuids", response_model=List[str])
-async def get_all_uuids():
-    """Get list of all available UUIDs"""
-    db = SessionLocal()
-    try:
-        form_data = db.query(FormData).all()
-        return [data.uuid for data in form_data]
-    finally:
-        db.close()
+def raw_form_data(row: FormData) -> Dict[str, Any]:
+    """Raw form fields of a record, as passed to the agent"""
+    return {
+        "name": row.name,
+        "email": row.email,
+        "phone": row.phone,
+        "address": row.address,
+        "company": row.company,
+        "position": row.position,
+        "notes": row.notes
+    }
+
+
+def uuid_page_query(session: Session, cursor: Optional[str], prefix: Optional[str],
+                    contains: Optional[str], limit: int) -> List[str]:
+    """Keyset page of UUIDs after the cursor, reading only the uuid column"""
+    query = session.query(FormData.uuid)
+    if cursor:
+        query = query.filter(FormData.uuid > cursor)
+    if prefix:
+        # Range scan on the primary key instead of LIKE 'prefix%'
+        query = query.filter(FormData.uuid >= prefix, FormData.uuid < prefix + "\uffff")
+    if contains:
+        query = query.filter(func.instr(FormData.uuid, contains) > 0)
+    return [uuid for (uuid,) in query.order_by(FormData.uuid).limit(limit)]
+
+
+async def stream_uuids(prefix: Optional[str], contains: Optional[str]):
+    """Yield every matching UUID as NDJSON, one keyset chunk at a time"""
+    cursor = None
+    async with async_session() as db:
+        while True:
+            chunk = await db.run(uuid_page_query, cursor, prefix, contains, UUID_STREAM_CHUNK)
+            if not chunk:
+                break
+            yield "".join(json.dumps({"uuid": uuid}) + "\n" for uuid in chunk)
+            cursor = chunk[-1]
+
+
+@app.get("/api/uuids", response_model=UUIDPage)
+async def get_all_uuids(limit: int = 100, cursor: Optional[str] = None,
+                        prefix: Optional[str] = None, contains: Optional[str] = None,
+                        stream: bool = False, db: AsyncDB = Depends(get_db)):
+    """
+    Get a page of available UUIDs in sorted order
+    
+    Pass the returned next_cursor to get the following page. prefix and contains
+    filter server-side; stream=true returns every match as NDJSON instead.
+    """
+    prefix = prefix.strip().lower() if prefix else None
+    contains = contains.strip().lower() if contains else None
+    
+    if stream:
+        return StreamingResponse(stream_uuids(prefix, contains), media_type="application/x-ndjson")
+    
+    limit = max(1, min(limit, MAX_UUID_PAGE))
+    # Fetch one extra row to know whether another page exists
+    uuids = await db.run(uuid_page_query, cursor, prefix, contains, limit + 1)
+    has_more = len(uuids) > limit
+    uuids = uuids[:limit]
+    
+    return UUIDPage(uuids=uuids, next_cursor=uuids[-1] if has_more else None)
+
+
+@app.get("/api/search")
+async def search_records(q: str, limit: int = 10):
+    """Typeahead search over uuid, name, email and company"""
+    if search_index.refresh_due():
+        await asyncio.to_thread(refresh_search_index)
+    started = time.perf_counter()
+    results = search_index.search(q, limit=max(1, min(limit, MAX_SEARCH_RESULTS)))
+    
+    return {
+        "query": q,
+        "results": results,
+        "index_ready": search_index.ready,
+        "took_ms": round((time.perf_counter() - started) * 1000, 3)
+    }
 
 
 @app.post("/api/get-form-data", response_model=FormResponse)
-async def get_form_data(request: UUIDRequest):
+async def get_form_data(request: UUIDRequest, db: AsyncDB = Depends(get_db)):
     """Get form data by UUID using LLM agent"""
-    db = SessionLocal()
+    def load(session: Session) -> Optional[Dict[str, Any]]:
+        form_data = session.query(FormData).filter(FormData.uuid == request.uuid).first()
+        return raw_form_data(form_data) if form_data else None
+    
     try:
         # First, try to get data from database
-        form_data = db.query(FormData).filter(FormData.uuid == request.uuid).first()
+        raw_data = await db.run(load)
         
-        if not form_data:
+        if not raw_data:
             raise HTTPException(status_code=404, detail="UUID not found")
         
-        # Update access time and count
-        form_data.last_accessed = datetime.utcnow()
-        form_data.access_count += 1
-        db.commit()
+        # Count the access; written to the database by the next buffer flush
+        access_buffer.record(request.uuid)
+        prewarmer.prefetch_related(request.uuid)
+        
+        # In stale-while-revalidate mode a cache miss answers from the database
+        # and the LLM refinement is picked up by a later lookup
+        if request.swr if request.swr is not None else AGENT_SWR_MODE:
+            agent_response, provisional = await agent.map_uuid_to_form_swr(
+                uuid=request.uuid, raw_data=raw_data
+            )
+            return FormResponse(**agent_response, provisional=provisional)
         
         # Use OpenAI agent to intelligently map and format the data
-        agent_response = agent.map_uuid_to_form(
-            uuid=request.uuid,
-            raw_data={
-                "name": form_data.name,
-                "email": form_data.email,
-                "phone": form_data.phone,
-                "address": form_data.address,
-                "company": form_data.company,
-                "position": form_data.position,
-                "notes": form_data.notes
-            }
-        )
+        agent_response = await agent.map_uuid_to_form(uuid=request.uuid, raw_data=raw_data)
         
         return FormResponse(**agent_response)
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-    
+
+
+def sse_event(event: str, data: Any) -> str:
+    """Encode one server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def stream_form_events(uuid: str, raw_data: Dict[str, Any], swr: bool):
+    """Relay the agent's streaming form updates as server-sent events"""
+    events = agent.stream_uuid_to_form(uuid=uuid, raw_data=raw_data, swr=swr)
+    try:
+        async for kind, payload in events:
+            if kind == "field":
+                field, value = payload
+                yield sse_event("field", {"field": field, "value": value})
+            else:
+                yield sse_event(kind, payload)
     finally:
-        db.close()
+        # A client disconnect stops this generator; close the agent's stream with it
+        await events.aclose()
+
+
+@app.get("/api/get-form-data/stream")
+async def stream_form_data(uuid: str, swr: Optional[bool] = None, db: AsyncDB = Depends(get_db)):
+    """
+    Stream form data by UUID as server-sent events
+
+    Emits "raw" with the database fields straight away, a "field" event for
+    each value the LLM refines, and "done" with the final form. In
+    stale-while-revalidate mode (AGENT_SWR_MODE or ?swr=true) a cache miss
+    skips the field events and "done" carries the provisional form.
+    """
+    def load(session: Session) -> Optional[Dict[str, Any]]:
+        form_data = session.query(FormData).filter(FormData.uuid == uuid).first()
+        return raw_form_data(form_data) if form_data else None
+
+    raw_data = await db.run(load)
+    if not raw_data:
+        raise HTTPException(status_code=404, detail="UUID not found")
+
+    access_buffer.record(uuid)
+    prewarmer.prefetch_related(uuid)
+
+    return StreamingResponse(
+        stream_form_events(uuid, raw_data, swr if swr is not None else AGENT_SWR_MODE),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 
-@app.get("/api/duplicates")
-async def get_duplicates(threshold: float = 0.85):
-    """Detect duplicate records using intelligent agent"""
-    db = SessionLocal()
+@app.post("/api/get-form-data/batch", response_model=BatchFormResponse)
+async def get_form_data_batch(request: BatchUUIDRequest, db: AsyncDB = Depends(get_db)):
+    """Get form data for many UUIDs using batched LLM calls"""
+    # Deduplicate while keeping the caller's order
+    uuids = list(dict.fromkeys(request.uuids))
+    if len(uuids) > MAX_BATCH_UUIDS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {MAX_BATCH_UUIDS} UUIDs per batch"
+        )
+    
+    def load(session: Session) -> Dict[str, Dict[str, Any]]:
+        rows = session.query(FormData).filter(FormData.uuid.in_(uuids)).all()
+        return {row.uuid: raw_form_data(row) for row in rows}
+    
     try:
-        # Get all records
-        all_records = db.query(FormData).all()
-        records_data = [
-            {
-                "uuid": r.uuid,
-                "name": r.name,
-                "email": r.email,
-                "company": r.company,
-                "position": r.position
-            }
-            for r in all_records
-        ]
+        raw_records = await db.run(load)
+        
+        now = datetime.utcnow()
+        for uuid in raw_records:
+            access_buffer.record(uuid, now)
+        
+        formatted = await agent.map_uuids_to_forms(raw_records)
+        
+        return BatchFormResponse(
+            results=[FormResponse(**formatted[uuid]) for uuid in uuids if uuid in formatted],
+            missing=[uuid for uuid in uuids if uuid not in formatted]
+        )
+    
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+async def enqueue_job(kind: str, params: Dict[str, Any]) -> JSONResponse:
+    """Queue an analysis and point the client at its status endpoint"""
+    job_id = await job_queue.enqueue(kind, params)
+    return JSONResponse(
+        status_code=202,
+        content={"job_id": job_id, "status": "queued", "status_url": f"/api/jobs/{job_id}"}
+    )
+
+
+@app.get("/api/duplicates")
+async def get_duplicates(threshold: float = 0.85, limit: int = 100, offset: int = 0,
+                         background: bool = False):
+    """
+    Get stored duplicate pairs at or above a confidence threshold
+
+    Only pairs scoring at least the detector's borderline_low (0.75) are
+    stored, so lower thresholds are raised to it.
+    """
+    threshold = max(threshold, agent.duplicate_detector.borderline_low)
+    params = {"threshold": threshold, "limit": limit, "offset": offset}
+    if background:
+        return await enqueue_job("duplicates", params)
+    return await compute_duplicates(**params)
+
+
+async def compute_duplicates(threshold: float, limit: int, offset: int) -> Dict[str, Any]:
+    """Read stored duplicate pairs, adjudicating borderline ones first if enabled"""
+    async with async_session() as db:
+        # Let the LLM review borderline pairs once; verdicts are persisted
+        if DUPLICATE_LLM_ADJUDICATION:
+            await adjudicate_borderline_pairs(db, threshold)
         
-        # Use agent to intelligently detect duplicates
-        duplicates = agent.detect_duplicates_intelligently(records_data)
+        result = await db.run(duplicate_store.get_pairs, threshold, limit=limit, offset=offset)
         
         return {
-            "count": len(duplicates),
+            "count": result["total"],
             "threshold": threshold,
-            "duplicates": duplicates,
-            "intelligence": "AI-powered semantic analysis"
+            "duplicates": result["duplicates"],
+            "index_ready": duplicate_store.ready,
+            "intelligence": "Incremental similarity matching with AI adjudication"
         }
-    finally:
-        db.close()
+
+
+async def adjudicate_borderline_pairs(db: AsyncDB, threshold: float):
+    """Ask the agent about unreviewed pairs just below the threshold and store the verdicts"""
+    pending = await db.run(
+        duplicate_store.get_unadjudicated,
+        agent.duplicate_detector.borderline_low,
+        threshold,
+        DUPLICATE_ADJUDICATION_LIMIT
+    )
+    if not pending:
+        return
+    
+    records = await db.run(
+        duplicate_store.load_records, {row.uuid1 for row in pending} | {row.uuid2 for row in pending}
+    )
+    confirmed = await agent.adjudicate_duplicate_pairs(
+        [duplicate_store.as_pair(row) for row in pending],
+        records
+    )
+    verdicts = {frozenset((d["uuid1"], d["uuid2"])): d for d in confirmed}
+    
+    for row in pending:
+        row.adjudicated = True
+        verdict = verdicts.get(frozenset((row.uuid1, row.uuid2)))
+        if verdict:
+            row.confidence = float(verdict.get("confidence", row.confidence))
+            row.reason = verdict.get("reason", row.reason)
+            row.match_type = verdict.get("type", row.match_type)
+    await db.commit()
 
 
 @app.get("/api/database-stats")
-async def get_database_stats():
+async def get_database_stats(db: AsyncDB = Depends(get_db)):
     """Get database statistics and health metrics"""
-    db = SessionLocal()
-    try:
+    cached = stats_cache.get(DATABASE_STATS_KEY)
+    if cached is not None:
+        return cached
+    
+    def count(session: Session) -> Dict[str, int]:
         from datetime import timedelta
         
-        # Get total records
-        total_records = db.query(FormData).count()
-        
-        # Get duplicate count
-        duplicate_count = db.query(FormData).filter(FormData.is_duplicate == True).count()
-        
-        # Get stale records (not updated in 365 days)
+        # Stale records are those not updated in 365 days
         threshold_date = datetime.utcnow() - timedelta(days=365)
-        stale_count = db.query(FormData).filter(
-            FormData.updated_at < threshold_date
-        ).count()
+        is_duplicate = FormData.is_duplicate == True
+        is_stale = FormData.updated_at < threshold_date
         
-        # Active records (not duplicates, not stale)
-        active_records = total_records - duplicate_count - stale_count
+        # One pass over form_data instead of a COUNT per figure
+        total_records, duplicate_count, stale_count, active_records = session.query(
+            func.count(FormData.uuid),
+            func.sum(case((is_duplicate, 1), else_=0)),
+            func.sum(case((is_stale, 1), else_=0)),
+            # Active records are neither duplicates nor stale (counted once even if both)
+            func.sum(case((or_(is_duplicate, is_stale), 0), else_=1))
+        ).one()
         
         return {
-            "total_records": total_records,
-            "duplicate_count": duplicate_count,
-            "stale_count": stale_count,
-            "active_records": max(0, active_records)
+            "total_records": total_records or 0,
+            "duplicate_count": duplicate_count or 0,
+            "stale_count": stale_count or 0,
+            "active_records": active_records or 0
         }
-    finally:
-        db.close()
+    
+    stats = await db.run(count)
+    stats_cache.set(DATABASE_STATS_KEY, stats)
+    return stats
 
 
 @app.get("/api/stale-records")
-async def get_stale_records(days: int = 30):
-    """Get stale/inactive records with intelligent analysis"""
-    db = SessionLocal()
-    try:
-        from datetime import timedelta
-        threshold_date = datetime.utcnow() - timedelta(days=days)
-        
-        # Get potentially stale records
-        stale_candidates = db.query(FormData).filter(
-            FormData.updated_at < threshold_date
-        ).all()
-        
-        records_data = [
-            {
-                "uuid": r.uuid,
-                "name": r.name,
-                "position": r.position,
-                "last_accessed": r.last_accessed.isoformat() if r.last_accessed else None,
-                "days_inactive": (datetime.utcnow() - (r.last_accessed or r.updated_at)).days,
-                "access_count": r.access_count if r.access_count else 0
-            }
-            for r in stale_candidates
-        ]
-        
-        # Use agent to intelligently analyze stale records
-        analysis = agent.identify_stale_records_intelligently(records_data)
-        
-        # Enrich analysis with names
-        uuid_to_name = {r["uuid"]: r["name"] for r in records_data}
-        
-        if "stale_records" in analysis and analysis["stale_records"]:
-            for record in analysis["stale_records"]:
-                if "uuid" in record:
-                    record["name"] = uuid_to_name.get(record["uuid"], "Unknown")
-        
-        if "important_but_inactive" in analysis and analysis["important_but_inactive"]:
-            for record in analysis["important_but_inactive"]:
-                if "uuid" in record:
-                    record["name"] = uuid_to_name.get(record["uuid"], "Unknown")
+async def get_stale_records(days: int = 30, limit: int = 50, offset: int = 0,
+                            background: bool = False):
+    """Get stale/inactive records from the materialized analysis"""
+    params = {"days": days, "limit": limit, "offset": offset}
+    if background:
+        return await enqueue_job("stale-records", params)
+    return await compute_stale_records(**params)
+
+
+async def compute_stale_records(days: int, limit: int = 50, offset: int = 0) -> Dict[str, Any]:
+    """Page through precomputed staleness scores for records inactive for the given days"""
+    async with async_session() as db:
+        result = await db.run(stale_materializer.read, days, limit=limit, offset=offset)
         
         return {
-            "count": len(records_data),
+            "count": result["total"],
             "days_threshold": days,
-            "analysis": analysis,
-            "intelligence": "AI-powered context-aware analysis"
+            "analysis": result["analysis"],
+            "computed_at": result["computed_at"],
+            "summary_computed_at": result["summary_computed_at"],
+            "intelligence": "Materialized scoring with AI annotations"
         }
-    finally:
-        db.close()
+
+
+@app.post("/api/stale-records/refresh")
+async def refresh_stale_records():
+    """Rescore all records for staleness in the background"""
+    return await enqueue_job("stale-refresh", {})
 
 
 @app.get("/api/user-stats")
-async def get_user_stats():
+async def get_user_stats(background: bool = False):
     """Get user behavior statistics with intelligent insights"""
-    db = SessionLocal()
-    try:
-        from sqlalchemy import func
-        from models import FormInteraction
-        
+    if background:
+        return await enqueue_job("user-stats", {})
+    return await compute_user_stats()
+
+
+async def compute_user_stats() -> Dict[str, Any]:
+    """Count interactions and analyze recent behavior patterns"""
+    def load(session: Session):
         # Get basic stats
-        total_interactions = db.query(func.count(FormInteraction.id)).scalar() or 0
-        total_corrections = db.query(func.count(FormInteraction.id)).filter(
+        total_interactions = session.query(func.count(FormInteraction.id)).scalar() or 0
+        total_corrections = session.query(func.count(FormInteraction.id)).filter(
             FormInteraction.interaction_type == "correction"
         ).scalar() or 0
-        total_views = db.query(func.count(FormInteraction.id)).filter(
+        total_views = session.query(func.count(FormInteraction.id)).filter(
             FormInteraction.interaction_type == "view"
         ).scalar() or 0
         
         # Get recent interactions for intelligent analysis
-        recent_interactions = db.query(FormInteraction).order_by(
+        recent_interactions = session.query(FormInteraction).order_by(
             FormInteraction.timestamp.desc()
         ).limit(50).all()
         
@@ -261,9 +598,13 @@ async def get_user_stats():
             }
             for i in recent_interactions
         ]
+        return total_interactions, total_corrections, total_views, interactions_data
+    
+    async with async_session() as db:
+        total_interactions, total_corrections, total_views, interactions_data = await db.run(load)
         
         # Use agent to analyze behavior patterns
-        behavior_analysis = agent.analyze_user_behavior(interactions_data)
+        behavior_analysis = await agent.analyze_user_behavior(interactions_data)
         
         return {
             "total_interactions": total_interactions,
@@ -272,8 +613,6 @@ async def get_user_stats():
             "intelligent_analysis": behavior_analysis,
             "intelligence": "AI-powered behavior learning"
         }
-    finally:
-        db.close()
 
 
 @app.post("/api/record-interaction")
@@ -285,44 +624,54 @@ async def record_interaction(
     corrected_value: Optional[str] = None
 ):
     """Record user interaction for learning"""
-    db = SessionLocal()
-    try:
-        interaction = FormInteraction(
-            uuid=uuid,
-            field_name=field_name,
-            original_value=original_value,
-            corrected_value=corrected_value,
-            interaction_type=interaction_type
+    interaction_buffer.append([{
+        "uuid": uuid,
+        "field_name": field_name,
+        "interaction_type": interaction_type,
+        "original_value": original_value,
+        "corrected_value": corrected_value
+    }])
+    
+    return {"status": "recorded", "intelligence": "Learning from your behavior"}
+
+
+@app.post("/api/record-interactions")
+async def record_interactions(request: BatchInteractionRequest):
+    """Record many user interactions in one request"""
+    if len(request.interactions) > MAX_BATCH_INTERACTIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {MAX_BATCH_INTERACTIONS} interactions per request"
         )
-        db.add(interaction)
-        db.commit()
-        
-        return {"status": "recorded", "intelligence": "Learning from your behavior"}
-    finally:
-        db.close()
+    
+    interaction_buffer.append([i.model_dump() for i in request.interactions])
+    
+    return {"status": "recorded", "count": len(request.interactions)}
 
 
 @app.post("/api/mark-duplicate")
-async def mark_duplicate(duplicate_uuid: str, original_uuid: str):
+async def mark_duplicate(duplicate_uuid: str, original_uuid: str, db: AsyncDB = Depends(get_db)):
     """Mark a record as duplicate of another"""
-    db = SessionLocal()
-    try:
-        record = db.query(FormData).filter(FormData.uuid == duplicate_uuid).first()
-        if record:
-            record.is_duplicate = True
-            record.duplicate_of = original_uuid
-            db.commit()
-        return {"status": "marked", "duplicate_uuid": duplicate_uuid, "original_uuid": original_uuid}
-    finally:
-        db.close()
+    def mark(session: Session) -> bool:
+        record = session.query(FormData).filter(FormData.uuid == duplicate_uuid).first()
+        if not record:
+            return False
+        record.is_duplicate = True
+        record.duplicate_of = original_uuid
+        session.commit()
+        return True
+    
+    if await db.run(mark):
+        await agent.invalidate(duplicate_uuid)
+        stats_cache.delete(DATABASE_STATS_KEY)
+    return {"status": "marked", "duplicate_uuid": duplicate_uuid, "original_uuid": original_uuid}
 
 
 @app.put("/api/update-form-data/{uuid}")
-async def update_form_data(uuid: str, form_data: Dict[str, Any]):
+async def update_form_data(uuid: str, form_data: Dict[str, Any], db: AsyncDB = Depends(get_db)):
     """Update form data by UUID"""
-    db = SessionLocal()
-    try:
-        record = db.query(FormData).filter(FormData.uuid == uuid).first()
+    def apply(session: Session):
+        record = session.query(FormData).filter(FormData.uuid == uuid).first()
         
         if not record:
             raise HTTPException(status_code=404, detail="UUID not found")
@@ -344,27 +693,64 @@ async def update_form_data(uuid: str, form_data: Dict[str, Any]):
             record.notes = form_data["notes"]
         
         record.updated_at = datetime.utcnow()
-        db.commit()
+        index_record = duplicate_store.refresh_record(session, record)
+        session.commit()
+        index_record()
+        search_index.update({field: getattr(record, field) for field in SEARCH_FIELDS})
+    
+    try:
+        await db.run(apply)
+        
+        # Superseded formatted versions must not be served again
+        await agent.invalidate(uuid)
+        stats_cache.delete(DATABASE_STATS_KEY)
         
         return {"status": "success", "message": "Record updated successfully"}
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        db.close()
+
+
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Get a background job's status and result"""
+    job = await job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+# Job kinds accepted by the background queue
+job_queue.register("duplicates", lambda params: compute_duplicates(**params))
+job_queue.register("stale-records", lambda params: compute_stale_records(**params))
+job_queue.register("user-stats", lambda params: compute_user_stats(**params))
+job_queue.register("stale-refresh", lambda params: stale_materializer.refresh())
+
+
+@app.get("/api/agent-metrics")
+async def get_agent_metrics():
+    """Get agent cache and LLM usage metrics"""
+    return {
+        **await agent.get_metrics(),
+        "access_buffer": access_buffer.stats(),
+        "interaction_buffer": interaction_buffer.stats(),
+        "search_index": search_index.stats(),
+        "prewarm": prewarmer.stats()
+    }
 
 
 @app.get("/api/health")
 async def health_check():
     """Health check endpoint"""
-    llm_provider = os.getenv("LLM_PROVIDER", "openai").lower()
+    backends = [backend.name for backend in agent.router.backends]
     return {
         "status": "healthy",
-        "llm_provider": llm_provider,
+        "llm_provider": agent.provider,
+        "llm_backends": {backend.name: backend.breaker.state for backend in agent.router.backends},
         "openai_configured": bool(os.getenv("OPENAI_API_KEY")),
-        "lmstudio_enabled": llm_provider == "lmstudio"
+        "lmstudio_enabled": "lmstudio" in backends
     }
 
 
@@ -0,0 +1,128 @@
+"""
+Ordered schema migrations for the SQLite database.
+
+Each migration runs once, in its own transaction, and is recorded in the
+schema_version table. Deployed databases created before migrations existed
+are brought up to date in place without touching their data.
+
+Run directly to migrate ./uuid_forms.db and print the resulting version:
+    python migrations.py
+"""
+
+from typing import Callable, List, Tuple
+from datetime import datetime
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+
+from models import Base
+
+
+def _baseline(conn: Connection):
+    """Create any missing tables from the current models"""
+    Base.metadata.create_all(bind=conn)
+
+
+def _secondary_indexes(conn: Connection):
+    """Indexes for the filters and sorts used by stats, stale, duplicate and behavior queries"""
+    statements = [
+        # Stale scans and database stats filter on update time and duplicate flags
+        "CREATE INDEX IF NOT EXISTS ix_form_data_updated_at ON form_data (updated_at)",
+        "CREATE INDEX IF NOT EXISTS ix_form_data_duplicate ON form_data (is_duplicate, duplicate_of)",
+        "CREATE INDEX IF NOT EXISTS ix_form_data_access ON form_data (access_count, last_accessed)",
+        # Exact-value lookups run by the duplicate store on every write
+        "CREATE INDEX IF NOT EXISTS ix_form_data_email ON form_data (email)",
+        "CREATE INDEX IF NOT EXISTS ix_form_data_phone ON form_data (phone)",
+        "CREATE INDEX IF NOT EXISTS ix_form_data_name ON form_data (name)",
+        # Behavior stats count by type and read the most recent interactions
+        "CREATE INDEX IF NOT EXISTS ix_form_interactions_type_timestamp "
+        "ON form_interactions (interaction_type, timestamp)",
+        "CREATE INDEX IF NOT EXISTS ix_form_interactions_timestamp ON form_interactions (timestamp)",
+        "ANALYZE"
+    ]
+    for statement in statements:
+        conn.execute(text(statement))
+
+
+def _company_index(conn: Connection):
+    """Index for the pre-warmer's most-accessed-at-the-same-company lookup"""
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_form_data_company_access ON form_data (company, access_count)"
+    ))
+
+
+def _stale_local_category(conn: Connection):
+    """Remember the locally scored category so LLM verdicts that override it survive a rescore"""
+    columns = {row[1] for row in conn.execute(text("PRAGMA table_info(stale_record_scores)"))}
+    if "local_category" not in columns:
+        conn.execute(text("ALTER TABLE stale_record_scores ADD COLUMN local_category VARCHAR(20)"))
+    conn.execute(text(
+        "UPDATE stale_record_scores SET local_category = category WHERE local_category IS NULL"
+    ))
+
+
+def _signature_updated_index(conn: Connection):
+    """Index for loading signatures written by other server processes"""
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_record_signatures_updated_at ON record_signatures (updated_at)"
+    ))
+
+
+# (version, name, function) in the order they must be applied; never renumber
+MIGRATIONS: List[Tuple[int, str, Callable[[Connection], None]]] = [
+    (1, "baseline", _baseline),
+    (2, "secondary_indexes", _secondary_indexes),
+    (3, "company_index", _company_index),
+    (4, "stale_local_category", _stale_local_category),
+    (5, "signature_updated_index", _signature_updated_index),
+]
+
+
+def current_version(engine: Engine) -> int:
+    """Return the highest applied migration version (0 for a new database)"""
+    with engine.begin() as conn:
+        _ensure_version_table(conn)
+        return conn.execute(text("SELECT COALESCE(MAX(version), 0) FROM schema_version")).scalar()
+
+
+def run_migrations(engine: Engine) -> List[str]:
+    """
+    Apply every pending migration in order
+
+    Args:
+        engine: Engine bound to the database to migrate
+
+    Returns:
+        Names of the migrations that were applied
+    """
+    applied = []
+    version = current_version(engine)
+    for number, name, migrate in MIGRATIONS:
+        if number <= version:
+            continue
+        # Schema change and version bump commit together or not at all
+        with engine.begin() as conn:
+            migrate(conn)
+            conn.execute(
+                text("INSERT INTO schema_version (version, name, applied_at) VALUES (:v, :n, :t)"),
+                {"v": number, "n": name, "t": datetime.utcnow()}
+            )
+        applied.append(name)
+        print(f"✓ Applied migration {number}: {name}")
+    return applied
+
+
+def _ensure_version_table(conn: Connection):
+    conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS schema_version ("
+        "version INTEGER PRIMARY KEY, "
+        "name VARCHAR(100) NOT NULL, "
+        "applied_at DATETIME NOT NULL)"
+    ))
+
+
+if __name__ == "__main__":
+    from database import engine
+
+    run_migrations(engine)
+    print(f"Schema version: {current_version(engine)}")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Text, DateTime, Integer, Float, Boolean
+from sqlalchemy import Column, String, Text, DateTime, Integer, Float, Boolean, LargeBinary, UniqueConstraint, Index
 from sqlalchemy.ext.declarative import declarative_base
 from datetime import datetime
 
@@ -8,6 +8,16 @@ Base = declarative_base()
 class FormData(Base):
     """Model for storing form data associated with UUIDs"""
     __tablename__ = "form_data"
+    # Secondary indexes are added to existing databases by migrations.py
+    __table_args__ = (
+        Index("ix_form_data_updated_at", "updated_at"),
+        Index("ix_form_data_duplicate", "is_duplicate", "duplicate_of"),
+        Index("ix_form_data_access", "access_count", "last_accessed"),
+        Index("ix_form_data_email", "email"),
+        Index("ix_form_data_phone", "phone"),
+        Index("ix_form_data_name", "name"),
+        Index("ix_form_data_company_access", "company", "access_count"),
+    )
     
     uuid = Column(String(36), primary_key=True, index=True)
     name = Column(String(100), nullable=False)
@@ -46,6 +56,10 @@ class UserPreference(Base):
 class FormInteraction(Base):
     """Model for tracking user interactions with forms"""
     __tablename__ = "form_interactions"
+    __table_args__ = (
+        Index("ix_form_interactions_type_timestamp", "interaction_type", "timestamp"),
+        Index("ix_form_interactions_timestamp", "timestamp"),
+    )
     
     id = Column(Integer, primary_key=True, autoincrement=True)
     uuid = Column(String(36), nullable=False, index=True)
@@ -57,3 +71,85 @@ class FormInteraction(Base):
     
     def __repr__(self):
         return f"<FormInteraction(uuid={self.uuid}, field={self.field_name})>"
+
+
+class RecordSignature(Base):
+    """Model for persisted MinHash signatures used by the duplicate LSH index"""
+    __tablename__ = "record_signatures"
+    
+    uuid = Column(String(36), primary_key=True)
+    signature = Column(LargeBinary, nullable=False)  # Packed uint64 MinHash values per field
+    version = Column(String(50), nullable=False)  # Index parameters the signature was built with
+    updated_at = Column(DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f"<RecordSignature(uuid={self.uuid}, version={self.version})>"
+
+
+class DuplicatePair(Base):
+    """Model for duplicate pairs found by incremental matching (uuid1 < uuid2)"""
+    __tablename__ = "duplicate_pairs"
+    __table_args__ = (UniqueConstraint("uuid1", "uuid2", name="uq_duplicate_pair"),)
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    uuid1 = Column(String(36), nullable=False, index=True)
+    uuid2 = Column(String(36), nullable=False, index=True)
+    confidence = Column(Float, nullable=False, index=True)
+    reason = Column(Text, nullable=True)
+    match_type = Column(String(30), nullable=False)  # 'exact_match', 'likely_duplicate', 'possible_duplicate'
+    adjudicated = Column(Boolean, default=False)  # Reviewed by the LLM
+    detected_at = Column(DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f"<DuplicatePair(uuid1={self.uuid1}, uuid2={self.uuid2}, confidence={self.confidence})>"
+
+
+class Job(Base):
+    """Model for background analysis jobs and their results"""
+    __tablename__ = "jobs"
+    
+    id = Column(String(36), primary_key=True)
+    kind = Column(String(50), nullable=False)  # 'duplicates', 'stale-records', 'user-stats'
+    status = Column(String(20), nullable=False, index=True)  # 'queued', 'running', 'succeeded', 'failed'
+    params = Column(Text, nullable=True)  # JSON
+    result = Column(Text, nullable=True)  # JSON
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    
+    def __repr__(self):
+        return f"<Job(id={self.id}, kind={self.kind}, status={self.status})>"
+
+
+class StaleRecordScore(Base):
+    """Model for the materialized staleness score of each form record"""
+    __tablename__ = "stale_record_scores"
+    
+    uuid = Column(String(36), primary_key=True)
+    name = Column(String(100), nullable=True)
+    position = Column(String(100), nullable=True)
+    score = Column(Float, nullable=False, index=True)
+    category = Column(String(20), nullable=False, index=True)  # 'stale', 'important', 'active'
+    local_category = Column(String(20), nullable=True)  # Category scored locally, before any LLM verdict
+    reason = Column(Text, nullable=True)
+    annotated = Column(Boolean, default=False)  # Reason came from the LLM
+    last_activity = Column(DateTime, nullable=True)
+    last_accessed = Column(DateTime, nullable=True)
+    access_count = Column(Integer, default=0)
+    computed_at = Column(DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f"<StaleRecordScore(uuid={self.uuid}, score={self.score}, category={self.category})>"
+
+
+class AnalysisSnapshot(Base):
+    """Model for the latest result of a scheduled analysis, stored as JSON"""
+    __tablename__ = "analysis_snapshots"
+    
+    key = Column(String(50), primary_key=True)
+    payload = Column(Text, nullable=False)
+    computed_at = Column(DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f"<AnalysisSnapshot(key={self.key}, computed_at={self.computed_at})>"
@@ -0,0 +1,219 @@
+from typing import Dict, Any, List, Optional, Set, Tuple
+from collections import deque
+import asyncio
+import time
+
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session
+
+from models import FormData
+from duplicates import EMPTY_COMPANIES
+from llm_scheduler import PRIORITY_BACKGROUND
+
+
+# Fields passed to the agent, as in main.raw_form_data
+RAW_FIELDS = ("name", "email", "phone", "address", "company", "position", "notes")
+
+
+class CachePrewarmer:
+    """
+    Formats likely-to-be-opened records before anyone asks for them
+
+    On startup and every interval the most accessed records are queued; when
+    a record is opened, records at the same company and its duplicate_of
+    relations are queued ahead of them. A single worker runs the queue through
+    the agent, so rule-formatted and cached records cost nothing and LLM
+    completions are spaced to stay within rate_per_minute.
+    """
+
+    def __init__(self, session_factory, agent, top_n: int = 100, rate_per_minute: float = 30.0,
+                 related_limit: int = 5, max_queue: int = 500):
+        """
+        Args:
+            session_factory: Callable returning a new database session
+            agent: UUIDAgent whose cache is warmed
+            top_n: Most accessed records warmed on each periodic pass
+            rate_per_minute: Budget of LLM completions the pre-warmer may spend
+            related_limit: Same-company records prefetched when a record is opened
+            max_queue: Queued UUIDs beyond which new work is dropped
+        """
+        self.session_factory = session_factory
+        self.agent = agent
+        self.top_n = top_n
+        self.interval = 60.0 / rate_per_minute if rate_per_minute > 0 else 0.0
+        self.related_limit = related_limit
+        self.max_queue = max_queue
+
+        self._queue: deque = deque()
+        self._queued: Set[Tuple[str, str]] = set()
+        self._wake: Optional[asyncio.Event] = None
+        self._tasks: List[asyncio.Task] = []
+        self._next_slot = 0.0
+
+        self.warmed = 0  # Records that needed a completion
+        self.already_warm = 0  # Records the rules or the cache already answer
+        self.dropped = 0
+        self.failures = 0
+        self.last_pass: Optional[str] = None
+
+    async def start(self, interval_seconds: float):
+        """Start the worker and the periodic top-N pass"""
+        self._wake = asyncio.Event()
+        self._tasks = [
+            asyncio.create_task(self._work(), name="prewarm-worker"),
+            asyncio.create_task(self._run_periodically(interval_seconds), name="prewarm-schedule")
+        ]
+
+    async def stop(self):
+        """Cancel the worker and drop whatever is still queued"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue.clear()
+        self._queued.clear()
+
+    async def warm_top(self) -> int:
+        """Queue the top_n records by access_count, then recency; returns the number queued"""
+        uuids = await asyncio.to_thread(self._top_uuids)
+        queued = sum(self._enqueue(("warm", uuid)) for uuid in uuids)
+        self.last_pass = time.strftime("%Y-%m-%dT%H:%M:%S")
+        return queued
+
+    def prefetch_related(self, uuid: str):
+        """Queue records related to one that was just opened (returns immediately)"""
+        if self._wake is not None:
+            # The worker looks the relations up, keeping the request path free of queries
+            self._enqueue(("related", uuid), front=True)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return queue depth and warming counters"""
+        return {
+            "queued": len(self._queue),
+            "warmed": self.warmed,
+            "already_warm": self.already_warm,
+            "dropped": self.dropped,
+            "failures": self.failures,
+            "completions_per_minute": round(60.0 / self.interval, 2) if self.interval else None,
+            "last_pass": self.last_pass
+        }
+
+    def _enqueue(self, item: Tuple[str, str], front: bool = False) -> bool:
+        """Add a ("warm" | "related", uuid) item unless it is already queued"""
+        if item in self._queued:
+            return False
+        if len(self._queue) >= self.max_queue:
+            self.dropped += 1
+            return False
+        if front:
+            self._queue.appendleft(item)
+        else:
+            self._queue.append(item)
+        self._queued.add(item)
+        self._wake.set()
+        return True
+
+    async def _run_periodically(self, interval_seconds: float):
+        while True:
+            try:
+                queued = await self.warm_top()
+                print(f"✓ Pre-warm pass queued {queued} records")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Pre-warm pass error: {str(e)}")
+            await asyncio.sleep(interval_seconds)
+
+    async def _work(self):
+        while True:
+            if not self._queue:
+                self._wake.clear()
+                await self._wake.wait()
+                continue
+            item = self._queue.popleft()
+            self._queued.discard(item)
+            kind, uuid = item
+            try:
+                if kind == "related":
+                    related = await asyncio.to_thread(self._related_uuids, uuid)
+                    # Someone is looking at this neighbourhood now, so it goes ahead of the top-N pass
+                    for related_uuid in reversed(related):
+                        self._enqueue(("warm", related_uuid), front=True)
+                else:
+                    await self._warm(uuid)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.failures += 1
+                print(f"Pre-warm error for {uuid}: {str(e)}")
+
+    async def _warm(self, uuid: str):
+        raw_data = await asyncio.to_thread(self._load, uuid)
+        if raw_data is None:
+            return
+        if not await self.agent.needs_completion(uuid, raw_data):
+            self.already_warm += 1
+            return
+
+        # Space completions evenly so pre-warming never bursts against the provider
+        now = time.monotonic()
+        if self._next_slot > now:
+            await asyncio.sleep(self._next_slot - now)
+        self._next_slot = max(now, self._next_slot) + self.interval
+
+        await self.agent.warm_record(uuid, raw_data, priority=PRIORITY_BACKGROUND)
+        self.warmed += 1
+
+    def _load(self, uuid: str) -> Optional[Dict[str, Any]]:
+        db: Session = self.session_factory()
+        try:
+            row = db.query(*(getattr(FormData, field) for field in RAW_FIELDS)).filter(
+                FormData.uuid == uuid
+            ).first()
+            return row._asdict() if row else None
+        finally:
+            db.close()
+
+    def _top_uuids(self) -> List[str]:
+        db: Session = self.session_factory()
+        try:
+            rows = db.query(FormData.uuid).filter(FormData.access_count > 0).order_by(
+                FormData.access_count.desc(), FormData.last_accessed.desc()
+            ).limit(self.top_n)
+            return [uuid for (uuid,) in rows]
+        finally:
+            db.close()
+
+    def _related_uuids(self, uuid: str) -> List[str]:
+        """Duplicate relations first, then the most accessed records at the same company"""
+        db: Session = self.session_factory()
+        try:
+            record = db.query(FormData.company, FormData.duplicate_of).filter(
+                FormData.uuid == uuid
+            ).first()
+            if record is None:
+                return []
+
+            # is_duplicate leads ix_form_data_duplicate, so copies are found without a scan
+            duplicate_filter = and_(FormData.is_duplicate == True, FormData.duplicate_of == uuid)
+            if record.duplicate_of:
+                duplicate_filter = or_(duplicate_filter, FormData.uuid == record.duplicate_of)
+            related = [
+                related_uuid for (related_uuid,) in db.query(FormData.uuid).filter(
+                    duplicate_filter, FormData.uuid != uuid
+                )
+            ]
+
+            # Placeholders such as "N/A" would make every patient a colleague
+            company = (record.company or "").strip().lower()
+            if company not in EMPTY_COMPANIES and self.related_limit > 0:
+                related += [
+                    related_uuid for (related_uuid,) in db.query(FormData.uuid).filter(
+                        FormData.company == record.company, FormData.uuid != uuid
+                    ).order_by(
+                        FormData.access_count.desc(), FormData.last_accessed.desc()
+                    ).limit(self.related_limit)
+                ]
+            return list(dict.fromkeys(related))
+        finally:
+            db.close()
@@ -0,0 +1,226 @@
+from typing import Dict, Any, List, Optional, Set, Tuple
+from bisect import bisect_left, insort
+from datetime import datetime, timedelta
+from itertools import islice
+import re
+import threading
+import time
+
+from sqlalchemy.orm import Session
+
+from models import FormData
+
+
+SEARCH_FIELDS = ("uuid", "name", "email", "company")
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+# Edits committed slightly out of updated_at order are still caught by the next refresh
+REFRESH_OVERLAP = timedelta(seconds=5)
+
+
+def trigrams(value: str) -> Set[str]:
+    """Unpadded character trigrams (queries shorter than 3 characters use the prefix list)"""
+    return {value[i:i + 3] for i in range(len(value) - 2)}
+
+
+class SearchIndex:
+    """
+    In-memory typeahead index over uuid, name, email and company
+
+    Queries of three or more characters intersect trigram posting sets and
+    verify the substring; shorter queries bisect a sorted list of word
+    prefixes. Both paths touch only the matching records, so lookups stay in
+    the low milliseconds as the table grows. Edits re-index a single record;
+    edits made by other server processes are picked up by refresh(), which
+    re-reads rows whose updated_at moved since the last build or refresh.
+    """
+
+    MAX_CANDIDATES = 5000  # Candidates verified and ranked per query
+
+    def __init__(self, refresh_interval: float = 2.0):
+        """
+        Args:
+            refresh_interval: Seconds between refreshes from the database
+        """
+        self.refresh_interval = refresh_interval
+        self.last_seen: Optional[datetime] = None
+        self._last_refresh = 0.0
+        self._documents: Dict[str, Tuple[str, ...]] = {}  # uuid -> lowercased fields
+        self._display: Dict[str, Dict[str, str]] = {}
+        self._postings: Dict[str, Set[str]] = {}  # trigram -> uuids
+        self._tokens: List[Tuple[str, str]] = []  # sorted (word, uuid)
+        self._tokens_dirty = False
+        self._stale_tokens = 0
+        self._lock = threading.Lock()
+        self.ready = False
+
+    def build(self, db: Session, chunk_size: int = 1000) -> int:
+        """Index every record; returns the number indexed"""
+        started = datetime.utcnow()
+        count = 0
+        columns = [getattr(FormData, field) for field in SEARCH_FIELDS]
+        for row in db.query(*columns).yield_per(chunk_size):
+            self.update(row._asdict())
+            count += 1
+        with self._lock:
+            self._tokens.sort()
+            self._tokens_dirty = False
+            self.ready = True
+        self.last_seen = started
+        self._last_refresh = time.monotonic()
+        return count
+
+    def refresh_due(self) -> bool:
+        """Whether the index is built and refresh_interval has passed since the last refresh"""
+        return self.ready and time.monotonic() - self._last_refresh >= self.refresh_interval
+
+    def refresh(self, db: Session) -> int:
+        """Re-index records updated since the last build or refresh; returns the number re-indexed"""
+        self._last_refresh = time.monotonic()
+        started = datetime.utcnow()
+        columns = [getattr(FormData, field) for field in SEARCH_FIELDS]
+        # ix_form_data_updated_at keeps this to the edited rows
+        rows = db.query(*columns).filter(FormData.updated_at >= self.last_seen - REFRESH_OVERLAP).all()
+        for row in rows:
+            self.update(row._asdict())
+        self.last_seen = started
+        return len(rows)
+
+    def update(self, record: Dict[str, Any]):
+        """Insert or re-index one record (dict or row with the search fields)"""
+        display = {field: record.get(field) or "" for field in SEARCH_FIELDS}
+        fields = tuple(display[field].lower() for field in SEARCH_FIELDS)
+        uuid = display["uuid"]
+
+        with self._lock:
+            self._remove(uuid)
+            self._documents[uuid] = fields
+            self._display[uuid] = display
+            for gram in set().union(*(trigrams(value) for value in fields)):
+                self._postings.setdefault(gram, set()).add(uuid)
+            if self.ready:
+                for token in self._words(fields):
+                    insort(self._tokens, (token, uuid))
+            else:
+                # Bulk load appends and sorts once in build()
+                self._tokens.extend((word, uuid) for word in self._words(fields))
+                self._tokens_dirty = True
+
+    def remove(self, uuid: str):
+        """Drop a record from the index"""
+        with self._lock:
+            self._remove(uuid)
+
+    def search(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        Return the best matches for a typeahead query
+
+        Results are ranked by how the query matched (whole field prefix, word
+        prefix, then substring) and by field order: uuid, name, email, company.
+        """
+        query = " ".join(query.lower().split())
+        if not query:
+            return []
+
+        with self._lock:
+            if len(query) >= 3:
+                candidates = self._trigram_candidates(query)
+            else:
+                candidates = self._prefix_candidates(query)
+
+            ranked = []
+            word_start = re.compile(r"(?<![a-z0-9])" + re.escape(query))
+            # Very common fragments (e.g. "com") would rank most of the table
+            for uuid in islice(candidates, self.MAX_CANDIDATES):
+                if uuid not in self._documents:
+                    continue
+                rank = self._rank(self._documents[uuid], query, word_start)
+                if rank is not None:
+                    ranked.append((rank, self._display[uuid]["name"].lower(), uuid))
+            ranked.sort()
+
+            return [
+                {**self._display[uuid], "matched_field": SEARCH_FIELDS[rank[1]]}
+                for rank, _, uuid in ranked[:limit]
+            ]
+
+    def stats(self) -> Dict[str, Any]:
+        """Return index size information"""
+        with self._lock:
+            return {
+                "ready": self.ready,
+                "records": len(self._documents),
+                "trigrams": len(self._postings),
+                "tokens": len(self._tokens)
+            }
+
+    def _trigram_candidates(self, query: str) -> List[str]:
+        # Walk the rarest posting set and probe the others, stopping at the candidate cap
+        postings = sorted(
+            (self._postings.get(gram, set()) for gram in trigrams(query)),
+            key=len
+        )
+        if not postings or not postings[0]:
+            return []
+        rarest, others = postings[0], postings[1:]
+        matches = (uuid for uuid in rarest if all(uuid in posting for posting in others))
+        return list(islice(matches, self.MAX_CANDIDATES))
+
+    def _prefix_candidates(self, query: str) -> Set[str]:
+        if self._tokens_dirty:
+            self._tokens.sort()
+            self._tokens_dirty = False
+
+        candidates = set()
+        index = bisect_left(self._tokens, (query, ""))
+        while (index < len(self._tokens) and len(candidates) < self.MAX_CANDIDATES
+               and self._tokens[index][0].startswith(query)):
+            candidates.add(self._tokens[index][1])
+            index += 1
+        return candidates
+
+    @staticmethod
+    def _rank(fields: Tuple[str, ...], query: str, word_start: re.Pattern):
+        """(match kind, field index) for the best match, or None if the query does not match"""
+        best = None
+        for position, value in enumerate(fields):
+            if query not in value:
+                continue
+            if value.startswith(query):
+                kind = 0
+            elif word_start.search(value):
+                kind = 1
+            else:
+                kind = 2
+            if best is None or (kind, position) < best:
+                best = (kind, position)
+        return best
+
+    @staticmethod
+    def _words(fields: Tuple[str, ...]) -> Set[str]:
+        words = set(fields[0:1])  # The whole uuid, so short hex prefixes match
+        for value in fields[1:]:
+            words.update(TOKEN_PATTERN.findall(value))
+        return words
+
+    def _remove(self, uuid: str):
+        """Remove a record's postings (caller holds the lock)"""
+        fields = self._documents.pop(uuid, None)
+        if fields is None:
+            return
+        self._display.pop(uuid, None)
+        for gram in set().union(*(trigrams(value) for value in fields)):
+            posting = self._postings.get(gram)
+            if posting is not None:
+                posting.discard(uuid)
+                if not posting:
+                    del self._postings[gram]
+        # Stale (word, uuid) entries are re-verified on lookup and purged once they pile up
+        self._stale_tokens += len(self._words(fields))
+        if self._stale_tokens > max(len(self._tokens) // 2, 1000):
+            self._tokens = [
+                (word, owner) for owner, values in self._documents.items()
+                for word in self._words(values)
+            ]
+            self._tokens_dirty = True
+            self._stale_tokens = 0
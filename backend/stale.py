@@ -0,0 +1,303 @@
+from typing import Dict, Any, List, Optional, Tuple
+from datetime import datetime, timedelta
+import asyncio
+import json
+import math
+
+from sqlalchemy import func, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from models import FormData, StaleRecordScore, AnalysisSnapshot
+
+
+# Roles that usually stay relevant even when nobody opens the record
+PERMANENT_ROLE_KEYWORDS = (
+    "physician", "surgeon", "cardiologist", "neurologist", "oncologist", "pediatrician",
+    "dermatologist", "gastroenterologist", "administrator", "director", "pharmacist",
+    "nurse", "manager", "supervisor", "coordinator"
+)
+# Roles that naturally go out of date (discharged patients, temporary staff)
+TRANSIENT_ROLE_KEYWORDS = ("patient", "temporary", "temp", "contractor", "intern", "locum", "volunteer")
+
+CATEGORY_STALE = "stale"
+CATEGORY_IMPORTANT = "important"
+CATEGORY_ACTIVE = "active"
+
+SNAPSHOT_KEY = "stale_analysis"
+LEASE_KEY = "stale_refresh_lease"  # Snapshot row whose computed_at marks the last scheduled refresh
+
+
+def role_factor(name: str, position: str) -> float:
+    """Weight applied to inactivity based on how long-lived the role is"""
+    position = (position or "").lower()
+    if any(keyword in position for keyword in TRANSIENT_ROLE_KEYWORDS):
+        return 1.5
+    if (name or "").startswith("Dr.") or any(keyword in position for keyword in PERMANENT_ROLE_KEYWORDS):
+        return 0.6
+    return 1.0
+
+
+def score_record(row, now: datetime) -> Dict[str, Any]:
+    """
+    Score one record for staleness
+
+    A record never opened (access_count 0) is judged by updated_at alone,
+    since last_accessed defaults to the creation time. The category says how
+    the record should be treated once it is inactive; readers choose the
+    inactivity window.
+
+    Args:
+        row: Row with uuid, name, position, updated_at, last_accessed, access_count
+        now: Reference time
+
+    Returns:
+        Column values for a StaleRecordScore row
+    """
+    access_count = row.access_count or 0
+    updated_at = row.updated_at or now
+    last_activity = max(updated_at, row.last_accessed or updated_at) if access_count else updated_at
+    days_inactive = max((now - last_activity).days, 0)
+
+    factor = role_factor(row.name, row.position)
+    score = min(days_inactive / 365, 3.0) * factor / (1 + math.log1p(access_count))
+
+    if days_inactive == 0:
+        category, reason = CATEGORY_ACTIVE, None
+    elif factor < 1.0:
+        category, reason = CATEGORY_IMPORTANT, "Long-lived role; keep despite inactivity"
+    else:
+        category, reason = CATEGORY_STALE, f"Inactive {days_inactive} days with {access_count} views"
+
+    return {
+        "uuid": row.uuid,
+        "name": row.name,
+        "position": row.position,
+        "score": round(score, 4),
+        "category": category,
+        "local_category": category,
+        "reason": reason,
+        "annotated": False,
+        "last_activity": last_activity,
+        "last_accessed": row.last_accessed,
+        "access_count": access_count,
+        "computed_at": now
+    }
+
+
+class StaleMaterializer:
+    """
+    Scores every FormData row for staleness into the stale_record_scores table
+
+    The full table is scored locally on a schedule; only the top-ranked
+    candidates inactive for at least min_days are sent to the LLM for
+    annotations and a summary, so reads of /api/stale-records are paged
+    queries against precomputed rows filtered by the requested window.
+    """
+
+    def __init__(self, session_factory, agent, min_days: int = 90,
+                 annotate_top: int = 30, chunk_size: int = 1000):
+        """
+        Args:
+            session_factory: Callable returning a new database session
+            agent: UUIDAgent used to annotate the top candidates
+            min_days: Inactivity below which a record is not sent to the LLM
+            annotate_top: Number of top-ranked candidates sent to the LLM
+            chunk_size: Rows scored per batch
+        """
+        self.session_factory = session_factory
+        self.agent = agent
+        self.min_days = min_days
+        self.annotate_top = annotate_top
+        self.chunk_size = chunk_size
+        self.last_refresh: Optional[datetime] = None
+        self._lock = asyncio.Lock()
+
+    async def refresh(self) -> Dict[str, Any]:
+        """Rescore the whole table, then annotate the top candidates with the LLM"""
+        async with self._lock:
+            scored = await asyncio.to_thread(self._materialize)
+            candidates = await asyncio.to_thread(self._top_candidates)
+
+            analysis = await self.agent.identify_stale_records_intelligently(candidates)
+            await asyncio.to_thread(self._store_annotations, analysis)
+
+            self.last_refresh = datetime.utcnow()
+            print(f"✓ Stale analysis refreshed ({scored} records scored)")
+            return {"scored": scored, "annotated": len(candidates)}
+
+    async def run_periodically(self, interval_seconds: float):
+        """
+        Refresh on startup and then every interval until cancelled
+
+        With several server processes each one runs this loop, but only the
+        one that claims the lease for the interval rescores the table.
+        """
+        while True:
+            try:
+                if await asyncio.to_thread(self._claim_refresh, interval_seconds):
+                    await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Stale analysis refresh error: {str(e)}")
+            await asyncio.sleep(interval_seconds)
+
+    def read(self, db: Session, days: int, limit: int = 50, offset: int = 0) -> Dict[str, Any]:
+        """
+        Page through flagged records inactive for at least the given days
+
+        Returns:
+            Dict with total count, the analysis payload, when the scores were
+            computed and when the LLM summary was last written
+        """
+        now = datetime.utcnow()
+        query = db.query(StaleRecordScore).filter(
+            StaleRecordScore.category.in_((CATEGORY_STALE, CATEGORY_IMPORTANT)),
+            StaleRecordScore.last_activity < now - timedelta(days=days)
+        )
+        rows = query.order_by(
+            StaleRecordScore.score.desc(), StaleRecordScore.uuid
+        ).offset(offset).limit(limit).all()
+
+        def as_dict(row: StaleRecordScore) -> Dict[str, Any]:
+            return {
+                "uuid": row.uuid,
+                "name": row.name,
+                "position": row.position,
+                "reason": row.reason,
+                "score": row.score,
+                "days_inactive": (now - row.last_activity).days if row.last_activity else None,
+                "access_count": row.access_count,
+                "annotated": row.annotated
+            }
+
+        # Scores and the summary refresh independently: the summary is kept when the LLM is down
+        computed_at = db.query(func.max(StaleRecordScore.computed_at)).scalar()
+        snapshot = db.query(AnalysisSnapshot).filter(AnalysisSnapshot.key == SNAPSHOT_KEY).first()
+        summary = json.loads(snapshot.payload) if snapshot else {}
+
+        return {
+            "total": query.count(),
+            "analysis": {
+                "stale_records": [as_dict(r) for r in rows if r.category == CATEGORY_STALE],
+                "important_but_inactive": [as_dict(r) for r in rows if r.category == CATEGORY_IMPORTANT],
+                "recommendations": summary.get("recommendations", []),
+                "summary": summary.get("summary", "")
+            },
+            "computed_at": computed_at.isoformat() if computed_at else None,
+            "summary_computed_at": snapshot.computed_at.isoformat() if snapshot else None
+        }
+
+    # --- Synchronous database work (runs in worker threads) ---
+
+    def _claim_refresh(self, interval_seconds: float) -> bool:
+        """Take the refresh lease unless another process refreshed within the interval"""
+        db = self.session_factory()
+        try:
+            now = datetime.utcnow()
+            # A little slack so the previous holder's timer drift does not skip a whole interval
+            due = now - timedelta(seconds=interval_seconds * 0.9)
+            claimed = db.execute(
+                update(AnalysisSnapshot)
+                .where(AnalysisSnapshot.key == LEASE_KEY, AnalysisSnapshot.computed_at < due)
+                .values(computed_at=now)
+            ).rowcount
+            if not claimed:
+                # Either the lease is held or it does not exist yet; only the first insert wins
+                db.add(AnalysisSnapshot(key=LEASE_KEY, payload="{}", computed_at=now))
+            db.commit()
+            return True
+        except IntegrityError:
+            db.rollback()
+            return False
+        finally:
+            db.close()
+
+    def _materialize(self) -> int:
+        db = self.session_factory()
+        try:
+            now = datetime.utcnow()
+            # Keep LLM annotations, including overridden categories, while the local score agrees
+            previous = {
+                uuid: (local_category, category, reason)
+                for uuid, local_category, category, reason in db.query(
+                    StaleRecordScore.uuid, StaleRecordScore.local_category,
+                    StaleRecordScore.category, StaleRecordScore.reason
+                ).filter(StaleRecordScore.annotated == True)  # noqa: E712
+            }
+
+            rows = []
+            for row in db.query(
+                FormData.uuid, FormData.name, FormData.position, FormData.updated_at,
+                FormData.last_accessed, FormData.access_count
+            ).yield_per(self.chunk_size):
+                values = score_record(row, now)
+                kept = previous.get(row.uuid)
+                if kept and kept[0] == values["local_category"]:
+                    values["category"], values["reason"], values["annotated"] = kept[1], kept[2], True
+                rows.append(values)
+
+            # Replace the table in one transaction so readers never see a partial refresh
+            db.query(StaleRecordScore).delete()
+            for start in range(0, len(rows), self.chunk_size):
+                db.bulk_insert_mappings(StaleRecordScore, rows[start:start + self.chunk_size])
+            db.commit()
+            return len(rows)
+        finally:
+            db.close()
+
+    def _top_candidates(self) -> List[Dict[str, Any]]:
+        db = self.session_factory()
+        try:
+            now = datetime.utcnow()
+            rows = db.query(StaleRecordScore).filter(
+                StaleRecordScore.category.in_((CATEGORY_STALE, CATEGORY_IMPORTANT)),
+                StaleRecordScore.annotated == False,  # noqa: E712
+                StaleRecordScore.last_activity < now - timedelta(days=self.min_days)
+            ).order_by(StaleRecordScore.score.desc()).limit(self.annotate_top).all()
+            return [
+                {
+                    "uuid": r.uuid,
+                    "name": r.name,
+                    "position": r.position,
+                    "last_accessed": r.last_accessed.isoformat() if r.last_accessed else None,
+                    "days_inactive": (now - r.last_activity).days,
+                    "access_count": r.access_count
+                }
+                for r in rows
+            ]
+        finally:
+            db.close()
+
+    def _store_annotations(self, analysis: Dict[str, Any]):
+        db = self.session_factory()
+        try:
+            verdicts: List[Tuple[str, Dict[str, Any]]] = [
+                (CATEGORY_STALE, item) for item in analysis.get("stale_records") or []
+            ] + [
+                (CATEGORY_IMPORTANT, item) for item in analysis.get("important_but_inactive") or []
+            ]
+            for category, item in verdicts:
+                if not isinstance(item, dict) or "uuid" not in item:
+                    continue
+                row = db.query(StaleRecordScore).filter(StaleRecordScore.uuid == item["uuid"]).first()
+                if row is not None:
+                    row.category = category
+                    row.reason = item.get("reason") or row.reason
+                    row.annotated = True
+
+            # Keep the previous summary if the LLM was unavailable this round
+            if analysis.get("summary") or analysis.get("recommendations"):
+                snapshot = {
+                    "summary": analysis.get("summary", ""),
+                    "recommendations": analysis.get("recommendations", [])
+                }
+                db.merge(AnalysisSnapshot(
+                    key=SNAPSHOT_KEY,
+                    payload=json.dumps(snapshot, default=str),
+                    computed_at=datetime.utcnow()
+                ))
+            db.commit()
+        finally:
+            db.close()
@@ -0,0 +1,161 @@
+from typing import Any, AsyncIterator, List, Optional, Tuple
+import asyncio
+import json
+
+
+class JSONFieldStream:
+    """
+    Incremental parser for the top-level fields of a streamed JSON object
+
+    Feed completion deltas as they arrive; each call returns the (key, value)
+    pairs whose values finished in that chunk. Scalar values are decoded,
+    nested objects and arrays are returned as parsed JSON once closed.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self._state = "start"
+        self._key = ""
+        self._token = ""  # Raw text of the key or value being read
+        self._escape = False
+        self._depth = 0  # Nesting inside a container value
+        self._in_nested_string = False
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        """Consume a chunk of the completion and return newly completed fields"""
+        self.text += chunk
+        completed = []
+        for ch in chunk:
+            field = self._step(ch)
+            if field is not None:
+                completed.append(field)
+        return completed
+
+    def _step(self, ch: str):
+        state = self._state
+
+        if state == "start":
+            if ch == "{":
+                self._state = "key_or_end"
+        elif state == "key_or_end":
+            if ch == '"':
+                self._state, self._token = "key", ""
+            elif ch == "}":
+                self._state = "done"
+        elif state == "key":
+            if self._escape:
+                self._escape = False
+                self._token += ch
+            elif ch == "\\":
+                self._escape = True
+                self._token += ch
+            elif ch == '"':
+                self._key = self._decode_string(self._token)
+                self._state = "colon"
+            else:
+                self._token += ch
+        elif state == "colon":
+            if ch == ":":
+                self._state = "value"
+        elif state == "value":
+            if ch == '"':
+                self._state, self._token = "string", ""
+            elif ch in "{[":
+                self._state, self._token, self._depth = "nested", ch, 1
+            elif not ch.isspace():
+                self._state, self._token = "scalar", ch
+        elif state == "string":
+            if self._escape:
+                self._escape = False
+                self._token += ch
+            elif ch == "\\":
+                self._escape = True
+                self._token += ch
+            elif ch == '"':
+                self._state = "after_value"
+                return self._key, self._decode_string(self._token)
+            else:
+                self._token += ch
+        elif state == "scalar":
+            if ch in ",}":
+                self._state = "key_or_end" if ch == "," else "done"
+                return self._key, self._decode(self._token.strip())
+            self._token += ch
+        elif state == "nested":
+            self._token += ch
+            if self._in_nested_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_nested_string = False
+            elif ch == '"':
+                self._in_nested_string = True
+            elif ch in "{[":
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    self._state = "after_value"
+                    return self._key, self._decode(self._token)
+        elif state == "after_value":
+            if ch == ",":
+                self._state = "key_or_end"
+            elif ch == "}":
+                self._state = "done"
+        return None
+
+    @staticmethod
+    def _decode_string(raw: str) -> str:
+        try:
+            return json.loads(f'"{raw}"')
+        except ValueError:
+            return raw
+
+    @staticmethod
+    def _decode(raw: str) -> Any:
+        try:
+            return json.loads(raw)
+        except ValueError:
+            return raw
+
+
+class FieldBroadcast:
+    """
+    Fields parsed from one streamed completion, shared by every listener
+
+    The producer publishes fields and then closes with the final result;
+    listeners that join late replay the fields published so far.
+    """
+
+    def __init__(self):
+        self.fields: List[Tuple[str, Any]] = []
+        self.result: Optional[Any] = None
+        self.closed = False
+        self._changed = asyncio.Event()
+
+    def publish(self, field: str, value: Any):
+        self.fields.append((field, value))
+        self._notify()
+
+    def close(self, result: Any = None):
+        self.result = result
+        self.closed = True
+        self._notify()
+
+    async def listen(self) -> AsyncIterator[Tuple[str, Any]]:
+        """Yield every field, published or still to come, until the broadcast closes"""
+        index = 0
+        while True:
+            while index < len(self.fields):
+                yield self.fields[index]
+                index += 1
+            if self.closed:
+                return
+            await self._changed.wait()
+
+    def _notify(self):
+        # Waiters hold the old event; a fresh one is armed for the next change
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
@@ -1,13 +1,25 @@
 import { useEffect, useState } from "react";
-import { fetchFormData, fetchUUIDs } from "./api/formApi";
+import {
+  cancelFormLookup,
+  cancelSearch,
+  fetchFormData,
+  fetchUUIDs,
+  isLookupCancelled,
+  isValidUUID,
+  searchRecords,
+} from "./api/formApi";
 import "./App.css";
 import FormFields from "./components/FormFields";
 import StatusPanel from "./components/StatusPanel";
 import UUIDComboBox from "./components/UUIDComboBox";
 import { FormData } from "./types/FormData";
+import { SearchResult } from "./types/SearchResult";
 
 function App() {
   const [uuids, setUuids] = useState<string[]>([]);
+  const [uuidFilter, setUuidFilter] = useState("");
+  const [uuidCursor, setUuidCursor] = useState<string | null>(null);
+  const [searchResults, setSearchResults] = useState<SearchResult[] | null>(null);
   const [selectedUUID, setSelectedUUID] = useState<string>("");
   const [formData, setFormData] = useState<FormData>({
     uuid: "",
@@ -46,16 +58,44 @@ function App() {
     document.documentElement.setAttribute("data-theme", newTheme);
   };
 
-  const loadUUIDs = async () => {
+  // Load the first page for a filter, or append the page after the cursor
+  const loadUUIDs = async (filter = "", cursor: string | null = null) => {
     try {
-      const data = await fetchUUIDs();
-      setUuids(data);
+      const page = await fetchUUIDs(filter, cursor);
+      setUuids((prev) => (cursor ? [...prev, ...page.uuids] : page.uuids));
+      setUuidCursor(page.next_cursor);
     } catch (err) {
+      if (isLookupCancelled(err)) return;
       setError("Failed to load UUIDs");
       console.error(err);
     }
   };
 
+  // Typed text searches names, emails and companies too; empty text browses UUIDs
+  const handleUUIDFilterChange = async (filter: string) => {
+    setUuidFilter(filter);
+    if (!filter.trim()) {
+      cancelSearch();
+      setSearchResults(null);
+      loadUUIDs();
+      return;
+    }
+    try {
+      setSearchResults(await searchRecords(filter));
+    } catch (err) {
+      if (isLookupCancelled(err)) return;
+      console.error(err);
+      setSearchResults(null);
+      loadUUIDs(filter);
+    }
+  };
+
+  const handleLoadMoreUUIDs = () => {
+    if (uuidCursor) {
+      loadUUIDs(uuidFilter, uuidCursor);
+    }
+  };
+
   const handleUUIDSelect = async (uuid: string) => {
     setSelectedUUID(uuid);
     setError(null);
@@ -63,6 +103,8 @@ function App() {
 
     if (!uuid) {
       // Clear form if no UUID selected
+      cancelFormLookup();
+      setLoading(false);
       setFormData({
         uuid: "",
         name: "",
@@ -76,6 +118,13 @@ function App() {
       return;
     }
 
+    // Partially typed UUIDs are never sent to the backend
+    if (!isValidUUID(uuid)) {
+      cancelFormLookup();
+      setLoading(false);
+      return;
+    }
+
     setLoading(true);
 
     // Simulate progress for better UX
@@ -87,19 +136,25 @@ function App() {
     }, 200);
 
     try {
-      const data = await fetchFormData(uuid);
+      // Raw fields land first, then the form fills in as refined fields stream
+      const data = await fetchFormData(uuid, (partial) => {
+        setProgress((prev) => Math.max(prev, 50));
+        setFormData((prev) => ({ ...prev, ...partial }));
+      });
       setProgress(100);
       setFormData(data);
     } catch (err) {
+      clearInterval(progressInterval);
+      // A newer lookup has taken over the spinner
+      if (isLookupCancelled(err)) return;
       setError("Failed to fetch form data. Please check if the UUID exists.");
       console.error(err);
-    } finally {
-      clearInterval(progressInterval);
-      setTimeout(() => {
-        setLoading(false);
-        setProgress(0);
-      }, 300);
     }
+    clearInterval(progressInterval);
+    setTimeout(() => {
+      setLoading(false);
+      setProgress(0);
+    }, 300);
   };
 
   return (
@@ -129,8 +184,12 @@ function App() {
         <div className="form-container">
           <UUIDComboBox
             uuids={uuids}
+            hasMore={uuidCursor !== null}
+            searchResults={searchResults}
             selectedUUID={selectedUUID}
             onUUIDSelect={handleUUIDSelect}
+            onFilterChange={handleUUIDFilterChange}
+            onLoadMore={handleLoadMoreUUIDs}
           />
 
           {error && <div className="error-message">⚠️ {error}</div>}
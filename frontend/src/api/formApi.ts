@@ -1,16 +1,241 @@
 import axios from "axios";
 import { FormData } from "../types/FormData";
+import { SearchResult } from "../types/SearchResult";
+import { UUIDPage } from "../types/UUIDPage";
 
 const API_BASE_URL = "http://localhost:8000";
+const UUID_PAGE_SIZE = 100;
+const SEARCH_LIMIT = 10;
 
-export const fetchUUIDs = async (): Promise<string[]> => {
-  const response = await axios.get(`${API_BASE_URL}/api/uuids`);
-  return response.data;
+// Form lookups and searches wait for typing to settle; repeated lookups are served from memory
+const LOOKUP_DEBOUNCE_MS = 250;
+const FORM_CACHE_SIZE = 50;
+const FORM_CACHE_TTL_MS = 5 * 60 * 1000;
+
+const UUID_PATTERN =
+  /^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$/i;
+
+export const isValidUUID = (value: string): boolean =>
+  UUID_PATTERN.test(value.trim());
+
+// Thrown when a newer call replaces a lookup that has not finished
+export class LookupSupersededError extends Error {
+  constructor() {
+    super("Lookup superseded by a newer request");
+    this.name = "LookupSupersededError";
+  }
+}
+
+export const isLookupCancelled = (err: unknown): boolean =>
+  err instanceof LookupSupersededError || axios.isCancel(err);
+
+// Request volume counters, e.g. for checking how much the cache saves
+const stats = {
+  requested: 0,
+  sent: 0,
+  cacheHits: 0,
+  invalid: 0,
+  superseded: 0,
 };
 
-export const fetchFormData = async (uuid: string): Promise<FormData> => {
-  const response = await axios.post(`${API_BASE_URL}/api/get-form-data`, {
-    uuid,
+export const getFormApiStats = () => ({ ...stats });
+
+// Map iteration order is insertion order, so the first key is least recently used
+const formCache = new Map<string, { data: FormData; expiresAt: number }>();
+
+const getCachedForm = (uuid: string): FormData | null => {
+  const entry = formCache.get(uuid);
+  if (!entry) return null;
+  formCache.delete(uuid);
+  if (entry.expiresAt < Date.now()) return null;
+  formCache.set(uuid, entry);
+  return entry.data;
+};
+
+const cacheForm = (uuid: string, data: FormData) => {
+  formCache.delete(uuid);
+  formCache.set(uuid, { data, expiresAt: Date.now() + FORM_CACHE_TTL_MS });
+  if (formCache.size > FORM_CACHE_SIZE) {
+    formCache.delete(formCache.keys().next().value as string);
+  }
+};
+
+export const clearFormCache = () => formCache.clear();
+
+// Drop one record after it is edited so the next lookup refetches it
+export const invalidateForm = (uuid: string) => {
+  formCache.delete(uuid.trim().toLowerCase());
+};
+
+// Only the latest request of each kind matters; starting one aborts the previous
+const controllers = new Map<string, AbortController>();
+
+const latestSignal = (kind: string): AbortSignal => {
+  controllers.get(kind)?.abort();
+  const controller = new AbortController();
+  controllers.set(kind, controller);
+  return controller.signal;
+};
+
+export const fetchUUIDs = async (
+  contains = "",
+  cursor: string | null = null
+): Promise<UUIDPage> => {
+  const response = await axios.get(`${API_BASE_URL}/api/uuids`, {
+    params: {
+      limit: UUID_PAGE_SIZE,
+      contains: contains || undefined,
+      cursor: cursor || undefined,
+    },
+    signal: latestSignal("uuids"),
   });
   return response.data;
 };
+
+// Calls of each kind still waiting out the debounce
+const pendingCalls = new Map<
+  string,
+  { timer: ReturnType<typeof setTimeout>; reject: (reason: unknown) => void }
+>();
+
+// Reject a call that is still waiting out the debounce; returns whether there was one
+const cancelPending = (kind: string): boolean => {
+  const pending = pendingCalls.get(kind);
+  if (!pending) return false;
+  clearTimeout(pending.timer);
+  pending.reject(new LookupSupersededError());
+  pendingCalls.delete(kind);
+  return true;
+};
+
+// Run after LOOKUP_DEBOUNCE_MS unless another call of the same kind arrives first
+const debounced = <T>(kind: string, run: () => Promise<T>): Promise<T> =>
+  new Promise((resolve, reject) => {
+    cancelPending(kind);
+    const timer = setTimeout(() => {
+      pendingCalls.delete(kind);
+      run().then(resolve, reject);
+    }, LOOKUP_DEBOUNCE_MS);
+    pendingCalls.set(kind, { timer, reject });
+  });
+
+// Drop a pending or in-flight request of one kind
+const cancelKind = (kind: string): number => {
+  let cancelled = cancelPending(kind) ? 1 : 0;
+  const inFlight = controllers.get(kind);
+  if (inFlight) {
+    inFlight.abort();
+    controllers.delete(kind);
+    cancelled += 1;
+  }
+  return cancelled;
+};
+
+// Only the last query of a burst of keystrokes reaches the backend
+export const searchRecords = (query: string): Promise<SearchResult[]> =>
+  debounced("search", async () => {
+    const response = await axios.get(`${API_BASE_URL}/api/search`, {
+      params: { q: query, limit: SEARCH_LIMIT },
+      signal: latestSignal("search"),
+    });
+    return response.data.results;
+  });
+
+// Drop a search that is still waiting out the debounce and abort one in flight
+export const cancelSearch = () => {
+  cancelKind("search");
+};
+
+// Drop a lookup that is still waiting out the debounce and abort one in flight
+export const cancelFormLookup = () => {
+  stats.superseded += cancelKind("form");
+};
+
+// Receives the raw database fields first, then each field as the LLM refines it
+export type FormUpdateHandler = (partial: Partial<FormData>) => void;
+
+const parseEvent = (event: Event) => JSON.parse((event as MessageEvent).data);
+
+// Read /api/get-form-data/stream until its "done" event, closing it on abort
+const streamFormData = (
+  uuid: string,
+  signal: AbortSignal,
+  onUpdate: FormUpdateHandler
+): Promise<FormData> =>
+  new Promise((resolve, reject) => {
+    const source = new EventSource(
+      `${API_BASE_URL}/api/get-form-data/stream?uuid=${encodeURIComponent(uuid)}`
+    );
+    signal.addEventListener("abort", () => {
+      source.close();
+      reject(new LookupSupersededError());
+    });
+    source.addEventListener("raw", (event) => onUpdate(parseEvent(event)));
+    source.addEventListener("field", (event) => {
+      const { field, value } = parseEvent(event);
+      onUpdate({ [field]: value });
+    });
+    source.addEventListener("done", (event) => {
+      source.close();
+      resolve(parseEvent(event));
+    });
+    // Also fires for a 404; without close() the browser would reconnect
+    source.onerror = () => {
+      source.close();
+      reject(new Error(`Form data stream failed for ${uuid}`));
+    };
+  });
+
+/**
+ * Fetch formatted form data for a UUID.
+ *
+ * Malformed UUIDs are rejected without a request, cached responses resolve
+ * immediately, and other calls wait LOOKUP_DEBOUNCE_MS so that only the last
+ * of a burst reaches the backend. Superseded calls reject with an error for
+ * which isLookupCancelled() is true.
+ *
+ * With onUpdate the lookup streams: the handler gets the raw fields as soon
+ * as the record is loaded and each refined field as the LLM produces it.
+ */
+export const fetchFormData = (
+  uuid: string,
+  onUpdate?: FormUpdateHandler
+): Promise<FormData> => {
+  stats.requested += 1;
+  cancelFormLookup();
+
+  const key = uuid.trim().toLowerCase();
+  if (!isValidUUID(key)) {
+    stats.invalid += 1;
+    return Promise.reject(new Error(`Not a valid UUID: ${uuid}`));
+  }
+
+  const cached = getCachedForm(key);
+  if (cached) {
+    stats.cacheHits += 1;
+    return Promise.resolve(cached);
+  }
+
+  return debounced("form", async () => {
+    stats.sent += 1;
+    const signal = latestSignal("form");
+    try {
+      const data: FormData = onUpdate
+        ? await streamFormData(key, signal, onUpdate)
+        : (
+            await axios.post(
+              `${API_BASE_URL}/api/get-form-data`,
+              { uuid: key },
+              { signal }
+            )
+          ).data;
+      // Provisional answers are replaced by the refined form on a later lookup
+      if (!data.provisional) cacheForm(key, data);
+      return data;
+    } finally {
+      if (controllers.get("form")?.signal === signal) {
+        controllers.delete("form");
+      }
+    }
+  });
+};
@@ -1,5 +1,6 @@
 import { useEffect, useRef, useState } from "react";
 import { FormData } from "../types/FormData";
+import { invalidateForm } from "../api/formApi";
 
 interface FormFieldsProps {
   formData: FormData;
@@ -57,6 +58,9 @@ function FormFields({ formData, onUpdate }: FormFieldsProps) {
         throw new Error("Failed to save");
       }
 
+      // The cached copy is the pre-edit form
+      invalidateForm(dataToSave.uuid);
+
       setSaveStatus("saved");
       setIsEditMode(false);
 
@@ -40,6 +40,55 @@ interface DatabaseStats {
   active_records: number;
 }
 
+interface JobStatus<T> {
+  job_id: string;
+  status: "queued" | "running" | "succeeded" | "failed";
+  result: T | null;
+  error: string | null;
+}
+
+const API_BASE_URL = "http://localhost:8000";
+const JOB_POLL_MAX_INTERVAL_MS = 1000;
+const JOB_POLL_TIMEOUT_MS = 120000;
+
+// Resolve after ms, or reject as soon as the signal aborts
+const sleep = (ms: number, signal: AbortSignal) =>
+  new Promise<void>((resolve, reject) => {
+    const timer = setTimeout(resolve, ms);
+    signal.addEventListener(
+      "abort",
+      () => {
+        clearTimeout(timer);
+        reject(new DOMException("Aborted", "AbortError"));
+      },
+      { once: true },
+    );
+  });
+
+// Enqueue a background analysis and poll until its result is ready, the deadline passes or the signal aborts
+async function fetchJobResult<T>(
+  path: string,
+  errorMessage: string,
+  signal: AbortSignal,
+): Promise<T> {
+  const separator = path.includes("?") ? "&" : "?";
+  const response = await fetch(`${API_BASE_URL}${path}${separator}background=true`, { signal });
+  if (!response.ok) throw new Error(errorMessage);
+  const { job_id } = await response.json();
+
+  // Quick jobs finish within the first short poll; back off for slow ones
+  const deadline = Date.now() + JOB_POLL_TIMEOUT_MS;
+  for (let delay = 250; Date.now() < deadline; delay = Math.min(delay * 2, JOB_POLL_MAX_INTERVAL_MS)) {
+    await sleep(delay, signal);
+    const jobResponse = await fetch(`${API_BASE_URL}/api/jobs/${job_id}`, { signal });
+    if (!jobResponse.ok) throw new Error(errorMessage);
+    const job: JobStatus<T> = await jobResponse.json();
+    if (job.status === "succeeded" && job.result) return job.result;
+    if (job.status === "failed") throw new Error(job.error || errorMessage);
+  }
+  throw new Error(`${errorMessage}: timed out`);
+}
+
 interface StatusPanelProps {
   isOpen: boolean;
   onClose: () => void;
@@ -59,45 +108,53 @@ export default function StatusPanel({ isOpen, onClose }: StatusPanelProps) {
   const [error, setError] = useState<string | null>(null);
 
   useEffect(() => {
-    if (isOpen) {
-      loadData();
-    }
+    if (!isOpen) return;
+    // Closing the panel or switching tabs stops the previous tab's polling
+    const controller = new AbortController();
+    loadData(controller.signal);
+    return () => controller.abort();
   }, [isOpen, activeTab]);
 
-  const loadData = async () => {
+  const loadData = async (signal: AbortSignal) => {
     setLoading(true);
     setError(null);
     try {
       if (activeTab === "overview") {
         const statsResponse = await fetch(
           "http://localhost:8000/api/database-stats",
+          { signal },
         );
         if (!statsResponse.ok) throw new Error("Failed to load database stats");
         const statsData = await statsResponse.json();
         setDbStats(statsData);
       } else if (activeTab === "duplicates") {
-        const response = await fetch("http://localhost:8000/api/duplicates");
-        if (!response.ok) throw new Error("Failed to load duplicates");
-        const data = await response.json();
+        const data = await fetchJobResult<{ duplicates: DuplicateInfo[] }>(
+          "/api/duplicates",
+          "Failed to load duplicates",
+          signal,
+        );
         setDuplicates(data.duplicates || []);
       } else if (activeTab === "stale") {
-        const response = await fetch(
-          "http://localhost:8000/api/stale-records?days=365",
+        const data = await fetchJobResult<{ analysis: StaleAnalysis }>(
+          "/api/stale-records?days=365",
+          "Failed to load stale records",
+          signal,
         );
-        if (!response.ok) throw new Error("Failed to load stale records");
-        const data = await response.json();
         setStaleAnalysis(data.analysis || null);
       } else if (activeTab === "stats") {
-        const response = await fetch("http://localhost:8000/api/user-stats");
-        if (!response.ok) throw new Error("Failed to load user stats");
-        const data = await response.json();
+        const data = await fetchJobResult<UserStats>(
+          "/api/user-stats",
+          "Failed to load user stats",
+          signal,
+        );
         setUserStats(data);
       }
     } catch (error) {
+      if (signal.aborted) return;
       console.error("Failed to load data:", error);
       setError(error instanceof Error ? error.message : "An error occurred");
     } finally {
-      setLoading(false);
+      if (!signal.aborted) setLoading(false);
     }
   };
 
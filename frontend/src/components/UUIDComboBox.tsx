@@ -1,12 +1,25 @@
 import { useState, useRef, useEffect } from 'react';
+import { SearchResult } from '../types/SearchResult';
 
 interface UUIDComboBoxProps {
     uuids: string[];
+    hasMore: boolean;
+    searchResults: SearchResult[] | null;
     selectedUUID: string;
     onUUIDSelect: (uuid: string) => void;
+    onFilterChange: (filter: string) => void;
+    onLoadMore: () => void;
 }
 
-function UUIDComboBox({ uuids, selectedUUID, onUUIDSelect }: UUIDComboBoxProps) {
+function UUIDComboBox({
+    uuids,
+    hasMore,
+    searchResults,
+    selectedUUID,
+    onUUIDSelect,
+    onFilterChange,
+    onLoadMore,
+}: UUIDComboBoxProps) {
     const [isOpen, setIsOpen] = useState(false);
     const [inputValue, setInputValue] = useState('');
     const dropdownRef = useRef<HTMLDivElement>(null);
@@ -31,6 +44,9 @@ function UUIDComboBox({ uuids, selectedUUID, onUUIDSelect }: UUIDComboBoxProps)
         const value = e.target.value;
         setInputValue(value);
         onUUIDSelect(value);
+        // The dropdown lists server-side matches for what has been typed
+        onFilterChange(value);
+        setIsOpen(value.trim() !== '');
     };
 
     const handleDropdownSelect = (uuid: string) => {
@@ -59,7 +75,28 @@ function UUIDComboBox({ uuids, selectedUUID, onUUIDSelect }: UUIDComboBoxProps)
                     >
                         {isOpen ? '▲ Hide' : '▼ Select'}
                     </button>
-                    {isOpen && (
+                    {isOpen && searchResults !== null && (
+                        <div className="dropdown-menu">
+                            {searchResults.length === 0 ? (
+                                <div className="dropdown-item">No matching records</div>
+                            ) : (
+                                searchResults.map((result) => (
+                                    <div
+                                        key={result.uuid}
+                                        className="dropdown-item search-result"
+                                        onClick={() => handleDropdownSelect(result.uuid)}
+                                    >
+                                        <span className="search-result-name">{result.name}</span>
+                                        <span className="search-result-detail">
+                                            {result.matched_field === 'company' ? result.company : result.email}
+                                        </span>
+                                        <span className="search-result-uuid">{result.uuid}</span>
+                                    </div>
+                                ))
+                            )}
+                        </div>
+                    )}
+                    {isOpen && searchResults === null && (
                         <div className="dropdown-menu">
                             {uuids.length === 0 ? (
                                 <div className="dropdown-item">No UUIDs available</div>
@@ -74,6 +111,11 @@ function UUIDComboBox({ uuids, selectedUUID, onUUIDSelect }: UUIDComboBoxProps)
                                     </div>
                                 ))
                             )}
+                            {hasMore && (
+                                <div className="dropdown-item dropdown-more" onClick={onLoadMore}>
+                                    Load more…
+                                </div>
+                            )}
                         </div>
                     )}
                 </div>
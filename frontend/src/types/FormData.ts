@@ -7,4 +7,6 @@ export interface FormData {
   company: string;
   position: string;
   notes: string;
+  // Set by the backend's stale-while-revalidate mode while the LLM refinement is pending
+  provisional?: boolean;
 }
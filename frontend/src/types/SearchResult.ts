@@ -0,0 +1,7 @@
+export interface SearchResult {
+  uuid: string;
+  name: string;
+  email: string;
+  company: string;
+  matched_field: "uuid" | "name" | "email" | "company";
+}
@@ -0,0 +1,4 @@
+export interface UUIDPage {
+  uuids: string[];
+  next_cursor: string | null;
+}